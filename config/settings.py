@@ -2,8 +2,12 @@
 Configuración para el scraper de INE.Stat
 """
 
+from __future__ import annotations
+
+import functools
 import os
 from pathlib import Path
+from types import MappingProxyType
 
 # Configuración base
 BASE_URL = "https://stat.ine.cl/?lang=es&SubSessionId="
@@ -14,21 +18,55 @@ DATA_DIR = PROJECT_ROOT / "data"
 LOGS_DIR = PROJECT_ROOT / "logs"
 CONFIG_DIR = PROJECT_ROOT / "config"
 
-# Crear directorios si no existen
-for dir_path in [DATA_DIR, LOGS_DIR, CONFIG_DIR]:
-    dir_path.mkdir(exist_ok=True)
+# Cookies/localStorage del navegador guardados entre corridas (ver "persist_session")
+BROWSER_STATE_FILE = DATA_DIR / "browser_state.json"
+
+# Peticiones de exportación CSV capturadas por dataset (ver "reuse_export_requests")
+EXPORT_REQUESTS_FILE = DATA_DIR / "export_requests.json"
+
+# Último CSV descargado por dataset (ver "download_cache_ttl_hours")
+DOWNLOAD_CACHE_FILE = DATA_DIR / "download_cache.json"
+
+# Crear directorios bajo demanda (solo en rutas que escriben en ellos)
+_dirs_ready = False
+
+def ensure_dirs():
+    """Crea DATA_DIR, LOGS_DIR y CONFIG_DIR una sola vez por proceso."""
+    global _dirs_ready
+    if _dirs_ready:
+        return
+    for dir_path in [DATA_DIR, LOGS_DIR, CONFIG_DIR]:
+        dir_path.mkdir(parents=True, exist_ok=True)
+    _dirs_ready = True
 
-# Configuración del scraper
-SCRAPER_CONFIG = {
+# Configuración del scraper (solo lectura: copiar con .copy() para variar)
+SCRAPER_CONFIG = MappingProxyType({
     "timeout": 60000,  # 60 segundos
     "wait_for_selector": 15000,  # 15 segundos
     "download_timeout": 60000,  # 1 minuto para descargas
     "retry_attempts": 3,
     "delay_between_requests": 3,  # segundos entre requests
-}
+    "concurrent_pages": 4,  # páginas (contextos) descargando datasets en paralelo
+    "adaptive_concurrency": True,  # ajustar (AIMD) cuántas de esas páginas trabajan a la vez
+    "concurrent_modules": True,  # Agua y Aire a la vez, cada módulo en su contexto
+    "max_concurrent_downloads": 4,  # tope global de descargas a la vez (todos los módulos)
+    "max_browser_contexts": 6,  # tope de contextos Chromium abiertos en la corrida (0 = sin tope)
+    "verbose_debug": False,  # volcados de DOM/modales en el log (costosos por dataset)
+    "debug_screenshots": False,  # screenshot tras cargar el sitio
+    "blocked_resource_types": ("image", "font", "media"),  # recursos que no se descargan
+    # hosts de analítica/publicidad que tampoco se cargan (subcadena del host)
+    "blocked_hosts": ("google-analytics.com", "googletagmanager.com", "doubleclick.net", "facebook.net"),
+    "persist_session": True,  # reutilizar cookies/sesión de la corrida anterior (BROWSER_STATE_FILE)
+    "viewport": MappingProxyType({"width": 1280, "height": 800}),  # tamaño fijo de cada contexto
+    # repetir la petición de exportación capturada (EXPORT_REQUESTS_FILE) sin modal ni iframe
+    "reuse_export_requests": True,
+    # un dataset descargado hace menos de estas horas no se vuelve a descargar y su CSV se
+    # enlaza en la carpeta de la corrida (0 = descargar siempre; opt-in)
+    "download_cache_ttl_hours": 0,
+})
 
 # Configuración del navegador
-BROWSER_CONFIG = {
+BROWSER_CONFIG = MappingProxyType({
     "headless": True,  # Cambiar a False para debug - VISIBLE
     "slow_mo": 2000,   # Ralentizar acciones para evitar timeouts
     "args": [
@@ -38,7 +76,7 @@ BROWSER_CONFIG = {
         "--disable-web-security",
         "--start-maximized"  # Maximizar ventana para mejor visualización
     ]
-}
+})
 
 # Módulos objetivo (nombres exactos del HTML)
 # NOTA: Para habilitar el auto-descubrimiento de datasets, deja la lista "datasets" vacía: []
@@ -72,7 +110,7 @@ BROWSER_CONFIG = {
 # }
 
 # Configuración para auto-descubrimiento (ACTIVA):
-MODULES_TO_SCRAPE = {
+MODULES_TO_SCRAPE = MappingProxyType({
     "aire": {
         "name": "Módulo VBA- Estado - Aire",
         "datasets": []  # Lista vacía = auto-descubrimiento
@@ -81,7 +119,7 @@ MODULES_TO_SCRAPE = {
         "name": "Módulo VBA- Estado- Agua",
         "datasets": []  # Lista vacía = auto-descubrimiento
     }
-}
+})
 
 # Logging
 LOG_CONFIG = {
@@ -95,13 +133,13 @@ LOG_CONFIG = {
 DEFECT_DIR_PATH = "data/downloads/20250914_230910"
 
 # --- Carga de variables de entorno (.env) ---
-from dotenv import load_dotenv
-load_dotenv()  # busca .env en el cwd o padres
-
-# URL de conexión a PostgreSQL (incluye driver: postgresql+psycopg2://...)
-DATABASE_URL = os.getenv("DATABASE_URL", "").strip()
-
-if not DATABASE_URL:
-    # No lanzamos excepción aquí para no romper otras utilidades;
-    # el módulo de carga validará y dará un mensaje claro si falta.
-    pass
\ No newline at end of file
+@functools.lru_cache(maxsize=1)
+def get_database_url() -> str:
+    """
+    URL de conexión a PostgreSQL (incluye driver: postgresql+psycopg2://...).
+    Carga el .env (cwd o padres) solo la primera vez que se pide.
+    Si falta, retorna "": el módulo de carga validará y dará un mensaje claro.
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+    return os.getenv("DATABASE_URL", "").strip()
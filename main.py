@@ -13,29 +13,16 @@ import asyncio
 import sys
 import argparse
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 
 # Rutas para imports locales
 sys.path.append(str(Path(__file__).parent))
 sys.path.append(str(Path(__file__).parent / "src"))
 
-# Scraper y utils
-from src.scraper.ine_scraper import INEScraper
-from src.utils.logger import get_logger
+# Config (liviana). Scraper, utils y ops se importan dentro de cada comando,
+# así --countfiles/--standardize no cargan Playwright, loguru ni pandas.
 from config.settings import SCRAPER_CONFIG, BROWSER_CONFIG
-from config.settings import DEFECT_DIR_PATH
-
-# Listas esperadas
-from src.utils.expectedfiles import (
-    EXPECTED_DATASETS_AIRE,
-    EXPECTED_DATASETS_AGUA,
-    get_expected_datasets,
-)
-
-# Ops
-from src.ops.countfiles import count_files_in_directory, print_count_report
-from src.ops.missing import handle_missingfiles, compute_extras
-from src.ops.standardize import standardize_directory_names
+from config.settings import DEFECT_DIR_PATH, ensure_dirs
 
 
 # ---------------------------
@@ -56,6 +43,10 @@ Ejemplos:
     # Scraping
     parser.add_argument('--debug', '-d', action='store_true', help='Modo debug (navegador visible)')
     parser.add_argument('--headless', action='store_true', help='Forzar headless')
+    parser.add_argument('--pages', type=int, default=None,
+                        help='Páginas descargando en paralelo (default: SCRAPER_CONFIG, 1 en --debug)')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Descargar todo de nuevo, ignorando los CSV recientes en caché')
 
     # Utilidades
     parser.add_argument('--dir', default=DEFECT_DIR_PATH,
@@ -83,10 +74,14 @@ Ejemplos:
                         help='Schema destino en PostgreSQL (default: public)')
     parser.add_argument('--if-exists', choices=['append', 'replace', 'fail'], default='append',
                         help='Comportamiento si la tabla existe (default: append)')
-    parser.add_argument('--csv-sep', default=',',
-                        help='Separador del CSV (default: ,)')
-    parser.add_argument('--csv-encoding', default='utf-8-sig',
-                        help='Codificación del CSV (default: utf-8-sig)')
+    parser.add_argument('--csv-sep', default=None,
+                        help='Separador del CSV (default: se detecta con el primer archivo)')
+    parser.add_argument('--csv-encoding', default=None,
+                        help='Codificación del CSV (default: se detecta, utf-8-sig o latin-1)')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Cargas de CSV en paralelo (default: 4)')
+    parser.add_argument('--fast-load', action='store_true',
+                        help='COPY sin índices secundarios y con synchronous_commit=off')
 
 
     return parser.parse_args()
@@ -111,29 +106,43 @@ def get_browser_config(debug_mode: bool, force_headless: bool = False):
     return base_config
 
 
-def get_scraper_config(debug_mode: bool):
+def get_scraper_config(debug_mode: bool, pages: Optional[int] = None, refresh: bool = False):
     base_config = SCRAPER_CONFIG.copy()
     if debug_mode:
         base_config["timeout"] = 120000
         base_config["wait_for_selector"] = 30000
         base_config["delay_between_requests"] = 5
+        base_config["concurrent_pages"] = 1  # una sola ventana visible
+        base_config["concurrent_modules"] = False
+        base_config["verbose_debug"] = True
+        base_config["debug_screenshots"] = True
+    if pages is not None:
+        base_config["concurrent_pages"] = max(1, pages)
+    if refresh:
+        base_config["download_cache_ttl_hours"] = 0
     return base_config
 
 
 # ---------------------------
 # Scraper
 # ---------------------------
-async def run_scraper(debug: bool, headless_flag: bool) -> int:
+async def run_scraper(
+    debug: bool, headless_flag: bool, pages: Optional[int] = None, refresh: bool = False
+) -> int:
+    from src.scraper.ine_scraper import INEScraper
+    from src.utils.logger import get_logger
+
+    ensure_dirs()
     logger = get_logger(debug_mode=debug)
     browser_config = get_browser_config(debug, headless_flag)
-    scraper_config = get_scraper_config(debug)
+    scraper_config = get_scraper_config(debug, pages, refresh)
 
     try:
         scraper = INEScraper(browser_config=browser_config, scraper_config=scraper_config)
         async with scraper:
             logger.info("🌐 Scraper inicializado, comenzando extracción...")
             downloads = await scraper.scrape_all_modules()
-            report_path = scraper.generate_summary_report(downloads)
+            report_path = await scraper.generate_summary_report(downloads)
             logger.info(f"📊 Reporte generado: {report_path}")
             print(f"\n📊 Reporte completo disponible en: {report_path}")
         total_files = sum(len(files) for files in downloads.values())
@@ -147,6 +156,27 @@ async def run_scraper(debug: bool, headless_flag: bool) -> int:
         return 1
 
 
+def _run_async(coro):
+    """
+    Corre coro con uvloop (loop sobre libuv) si está instalado (solo POSIX,
+    opcional); si no, con asyncio.run. Sin uvloop.install(): obsoleto desde 3.12.
+    """
+    uvloop = None
+    if sys.platform != "win32":
+        try:
+            import uvloop
+        except ImportError:
+            pass
+    if uvloop is None:
+        return asyncio.run(coro)
+    if sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+            return runner.run(coro)
+    # 3.9/3.10: sin asyncio.Runner, la política de uvloop solo para esta corrida
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return asyncio.run(coro)
+
+
 # ---------------------------
 # Main
 # ---------------------------
@@ -155,8 +185,16 @@ def main():
 
     # Contar archivos
     if args.countfiles:
+        from src.ops.countfiles import count_files_in_directory, print_count_report
+        from src.ops.missing import compute_extras
+        from src.utils.expectedfiles import (
+            EXPECTED_DATASETS_AIRE,
+            EXPECTED_DATASETS_AGUA,
+            EXPECTED_ALL_SET,
+        )
         target_dir = Path(args.dir)
-        total = count_files_in_directory(target_dir)
+        present_csvs: List[str] = []
+        total, ext_map = count_files_in_directory(target_dir, csv_names=present_csvs)
 
         expected_counts = {
             "aire": len(EXPECTED_DATASETS_AIRE),
@@ -166,11 +204,9 @@ def main():
 
         extras_count = 0
         if total >= 0:
-            present_csvs = [p.name for p in target_dir.rglob("*.csv")]
-            expected_all = get_expected_datasets("aire") + get_expected_datasets("agua")
-            extras_count = len(compute_extras(expected_all, present_csvs))
+            extras_count = len(compute_extras(EXPECTED_ALL_SET, present_csvs))
 
-        print_count_report(target_dir, total, expected_counts)
+        print_count_report(target_dir, total, expected_counts, ext_map=ext_map)
         if total >= 0:
             print(f"🟡 CSV extra (no esperados): {extras_count}")
             print("=" * 60)
@@ -180,12 +216,14 @@ def main():
 
     # Missing files
     if args.missingfiles:
+        from src.ops.missing import handle_missingfiles
         target_dir = Path(args.dir)
         code = handle_missingfiles(target_dir, scope=args.scope)
         sys.exit(code)
 
     # Estandarizar nombres
     if args.standardize:
+        from src.ops.standardize import standardize_directory_names
         target_dir = Path(args.dir)
         if not target_dir.exists() or not target_dir.is_dir():
             print(f"⚠️  La carpeta objetivo no existe o no es un directorio: {target_dir}")
@@ -219,6 +257,8 @@ def main():
                 recursive=True,
                 sep=args.csv_sep,
                 encoding=args.csv_encoding,
+                workers=args.workers,
+                fast_load=args.fast_load,
             )
         except Exception as e:
             print(f"❌ Error al cargar a la base de datos: {e}")
@@ -236,7 +276,7 @@ def main():
 
 
     # Scraper por defecto
-    code = asyncio.run(run_scraper(args.debug, args.headless))
+    code = _run_async(run_scraper(args.debug, args.headless, args.pages, args.refresh))
     sys.exit(code)
 
 
@@ -3,19 +3,42 @@
 Ops: conteo de archivos y reporte de consola.
 """
 
+import os
+from collections import Counter
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
 
-def count_files_in_directory(target: Path) -> int:
-    """Cuenta todos los archivos (no directorios) de forma recursiva en 'target'."""
+def count_files_in_directory(target: Path,
+                             csv_names: Optional[List[str]] = None) -> Tuple[int, Dict[str, int]]:
+    """
+    Cuenta todos los archivos (no directorios) de forma recursiva en 'target'
+    y, en la misma pasada, los agrupa por extensión.
+    Si se pasa 'csv_names', agrega ahí los nombres de los .csv encontrados.
+    Retorna (total, {extension: cantidad}); total = -1 si 'target' no es válido.
+    """
     if not target.exists() or not target.is_dir():
-        return -1
-    return sum(1 for p in target.rglob('*') if p.is_file())
+        return -1, {}
+    total = 0
+    ext_map: Counter = Counter()
+    stack = [str(target)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    stack.append(e.path)
+                elif e.is_file():
+                    total += 1
+                    ext = os.path.splitext(e.name)[1]
+                    ext_map[ext.lower() or "(sin extensión)"] += 1
+                    if csv_names is not None and ext == ".csv":
+                        csv_names.append(e.name)
+    return total, dict(ext_map)
 
 
 def print_count_report(target: Path, total: int,
-                       expected: Dict[str, int] | None = None) -> None:
+                       expected: Dict[str, int] | None = None,
+                       ext_map: Dict[str, int] | None = None) -> None:
     """Imprime reporte del conteo de archivos (con esperados si se proveen)."""
     print("=" * 60)
     print("📂 Contador de archivos")
@@ -27,14 +50,10 @@ def print_count_report(target: Path, total: int,
         print("⚠️  La carpeta no existe o no es un directorio.")
     print("-" * 60)
 
-    # Desglose por extensión y conteo de CSV
-    ext_map: Dict[str, int] = {}
+    # Desglose por extensión y conteo de CSV (ext_map viene del conteo)
+    ext_map = ext_map or {}
     csv_count = 0
     if total >= 0:
-        for p in target.rglob('*'):
-            if p.is_file():
-                ext = p.suffix.lower() or "(sin extensión)"
-                ext_map[ext] = ext_map.get(ext, 0) + 1
         if ext_map:
             print("📑 Por extensión:")
             for ext, cnt in sorted(ext_map.items(), key=lambda x: (-x[1], x[0])):
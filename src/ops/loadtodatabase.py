@@ -3,47 +3,163 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Optional, Tuple, Dict, List
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple, Dict, List, Iterator
+import csv
+import importlib.util
+import os
 import re
 
 import pandas as pd
+from loguru import logger
+from psycopg2.extras import execute_values
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
 
 from src.ops.standardize import to_sql_identifier
-from config.settings import DATABASE_URL  # <- desde .env vía settings.py
+from config.settings import get_database_url  # <- desde .env vía settings.py
+
+
+# Nombres de columna con pinta de fecha y valores con pinta de número
+_DATE_RE = re.compile(r"fecha|date|time|datetime|anio|ano|year|mes|month", re.IGNORECASE)
+_NUMERIC_RE = re.compile(r"^\s*[-+]?\.?\d")
+
+# Parser multihilo de Arrow para lecturas completas si pyarrow está instalado
+_HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+# Formatos de fecha que se prueban con pyarrow.compute.strptime (en orden)
+_DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y-%m", "%Y")
 
 
 def _normalize_columns(cols: List[str]) -> List[str]:
-    seen: Dict[str, int] = {}
+    seen: Counter = Counter()
     out: List[str] = []
     for c in cols:
         base = to_sql_identifier(c or "col")
-        if base not in seen:
-            seen[base] = 1
-            out.append(base)
-        else:
-            seen[base] += 1
-            out.append(f"{base}_{seen[base]}")
+        seen[base] += 1
+        out.append(base if seen[base] == 1 else f"{base}_{seen[base]}")
     return out
 
 
-def _infer_types(df: pd.DataFrame) -> pd.DataFrame:
-    df2 = df.copy()
-    # Numéricos
-    for col in df2.columns:
-        if pd.api.types.is_object_dtype(df2[col]):
-            conv = pd.to_numeric(df2[col], errors="coerce", downcast="integer")
-            if conv.notna().sum() > 0:
-                df2[col] = conv
+def _parse_dates(values: pd.Series) -> pd.Series:
+    """
+    Parsea fechas en texto. Con pyarrow prueba _DATE_FORMATS con el kernel C++
+    strptime y combina los intentos con coalesce; si Arrow no reconoce nada
+    (o no está instalado) recurre a pd.to_datetime(format="mixed").
+    """
+    if _HAS_PYARROW:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        try:
+            arr = pa.array(values, type=pa.string(), from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arr = None
+        if arr is not None:
+            parsed = None
+            for fmt in _DATE_FORMATS:
+                attempt = pc.strptime(arr, format=fmt, unit="s", error_is_null=True)
+                parsed = attempt if parsed is None else pc.coalesce(parsed, attempt)
+            if parsed is not None and parsed.null_count < len(parsed):
+                return pd.Series(
+                    parsed.to_numpy(zero_copy_only=False), index=values.index, name=values.name
+                )
+    return pd.to_datetime(values, errors="coerce", format="mixed", cache=True)
+
+
+def _infer_types_inplace(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convierte en el lugar columnas object a numéricas y fechas (por nombre).
+    Retorna el mismo df para encadenar.
+    """
+    # Numéricos: solo si alguna de las primeras 1000 filas parece número
+    for col in df.select_dtypes(include="object").columns:
+        head = df[col].head(1000).dropna().astype(str)
+        if not head.str.match(_NUMERIC_RE).any():
+            continue
+        # Sin downcast: el DDL sale de la muestra y un int8/int16 de las primeras
+        # filas (SMALLINT) haría fallar el COPY con valores mayores más abajo
+        conv = pd.to_numeric(df[col], errors="coerce")
+        if conv.notna().any():
+            df[col] = conv
     # Fechas por nombre
-    date_like = [c for c in df2.columns if re.search(r"(fecha|date|time|datetime|anio|ano|year|mes|month)", c)]
-    for col in date_like:
-        if pd.api.types.is_object_dtype(df2[col]):
-            dt = pd.to_datetime(df2[col], errors="coerce", infer_datetime_format=True)
-            if dt.notna().sum() > 0:
-                df2[col] = dt
-    return df2
+    for col in df.select_dtypes(include="object").columns:
+        if _DATE_RE.search(col):
+            dt = _parse_dates(df[col])
+            if dt.notna().any():
+                df[col] = dt
+    return df
+
+
+def _read_full_csv(csv_path: Path, sep: str, encoding: str) -> pd.DataFrame:
+    """
+    Lee el CSV completo. Con pyarrow usa engine="pyarrow" (multihilo, ya
+    infiere numéricos); si no, el parser C de pandas.
+    """
+    if _HAS_PYARROW:
+        # Arrow decodifica UTF-8 nativo y salta el BOM por sí mismo
+        enc = "utf-8" if encoding.lower().replace("_", "-") == "utf-8-sig" else encoding
+        return pd.read_csv(
+            csv_path,
+            sep=sep,
+            encoding=enc,
+            engine="pyarrow",
+            dtype_backend="numpy_nullable",
+        )
+    return pd.read_csv(
+        csv_path,
+        sep=sep,
+        encoding=encoding,
+        low_memory=False,
+        dtype_backend="numpy_nullable" if hasattr(pd, "options") else None,
+    )
+
+
+def _iter_csvs(root: Path, recursive: bool) -> Iterator[str]:
+    """Rutas (str) de los .csv bajo root vía os.scandir, sin crear Path por entrada."""
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        stack.append(entry.path)
+                elif entry.name.endswith(".csv") and entry.is_file():
+                    yield entry.path
+
+
+def _sniff_csv(
+    csv_path: Path,
+    sep: Optional[str],
+    encoding: Optional[str],
+) -> Tuple[str, str]:
+    """
+    Detecta (separador, codificación) con los primeros 64 KB de un CSV.
+    Solo se detecta lo que venga en None: codificación utf-8-sig y si no
+    latin-1; separador con csv.Sniffer entre , ; tab y | (',' si duda).
+    """
+    with open(csv_path, "rb") as fh:
+        head = fh.read(65536)
+    if encoding is None:
+        for candidate in ("utf-8-sig", "latin-1"):
+            try:
+                head.decode(candidate)
+            except UnicodeDecodeError:
+                # Un corte a mitad de carácter multibyte no cuenta como error
+                try:
+                    head[:-3].decode(candidate)
+                except UnicodeDecodeError:
+                    continue
+            encoding = candidate
+            break
+    if sep is None:
+        text_head = head.decode(encoding, errors="ignore")
+        try:
+            sep = csv.Sniffer().sniff(text_head, delimiters=",;\t|").delimiter
+        except csv.Error:
+            sep = ","
+    return sep, encoding
 
 
 def _resolve_table_name(csv_path: Path, table_name: Optional[str]) -> str:
@@ -57,6 +173,109 @@ def _ensure_schema(engine: Engine, schema: str) -> None:
         conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
 
 
+def _ensure_table(
+    engine: Engine,
+    schema: str,
+    table: str,
+    df_sample: pd.DataFrame,
+    if_exists: str,
+    table_exists: bool,
+) -> None:
+    """
+    Emite el DDL de la tabla a partir de la muestra con un único CREATE TABLE
+    (sin la introspección de to_sql). Respeta if_exists: fail/replace/append.
+    """
+    if table_exists and if_exists == "fail":
+        raise ValueError(f"Table '{table}' already exists.")
+    ddl = pd.io.sql.get_schema(df_sample, name=table, con=engine, schema=schema)
+    ddl = ddl.replace("CREATE TABLE", "CREATE TABLE IF NOT EXISTS", 1)
+    with engine.begin() as conn:
+        if table_exists and if_exists == "replace":
+            conn.execute(text(f'DROP TABLE "{schema}"."{table}"'))
+        conn.execute(text(ddl))
+
+
+# Índices secundarios (no PK ni respaldo de constraints) de una tabla
+_SECONDARY_INDEXES_SQL = """
+SELECT pg_get_indexdef(x.indexrelid), quote_ident(n.nspname) || '.' || quote_ident(i.relname)
+FROM pg_index x
+JOIN pg_class i ON i.oid = x.indexrelid
+JOIN pg_namespace n ON n.oid = i.relnamespace
+WHERE x.indrelid = %s::regclass
+  AND NOT x.indisprimary
+  AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)
+"""
+
+
+def _copy_csv(
+    engine: Engine,
+    csv_path: Path,
+    schema: str,
+    table: str,
+    columns: List[str],
+    sep: str,
+    encoding: str,
+    fast_load: bool = False,
+) -> int:
+    """
+    Vuelca el CSV completo con COPY ... FROM STDIN (streaming, memoria plana).
+    HEADER TRUE descarta la cabecera original; las columnas se mapean por
+    posición a la lista normalizada. Devuelve filas copiadas.
+    Las fechas en texto se interpretan día-primero (datestyle ISO, DMY), como
+    las parsea la inferencia de tipos, sin depender del DateStyle del servidor.
+    Con fast_load, dentro de la misma transacción: synchronous_commit=off y
+    los índices secundarios se eliminan antes del COPY y se recrean después.
+    """
+    qualified = f'"{schema}"."{table}"'
+    cols = ", ".join(f'"{c}"' for c in columns)
+    delim = sep.replace("'", "''")
+    sql = (
+        f'COPY {qualified} ({cols}) FROM STDIN '
+        f"WITH (FORMAT CSV, HEADER TRUE, DELIMITER '{delim}')"
+    )
+    raw = engine.raw_connection()
+    try:
+        with open(csv_path, "r", encoding=encoding, newline="") as fh:
+            cur = raw.cursor()
+            try:
+                index_defs: List[str] = []
+                cur.execute("SET LOCAL datestyle = 'ISO, DMY'")
+                if fast_load:
+                    cur.execute("SET LOCAL synchronous_commit = off")
+                    cur.execute(_SECONDARY_INDEXES_SQL, (qualified,))
+                    found = cur.fetchall()
+                    for _, index_name in found:
+                        cur.execute(f"DROP INDEX {index_name}")
+                    index_defs = [index_def for index_def, _ in found]
+                cur.copy_expert(sql, fh)
+                rows = cur.rowcount
+                if index_defs:
+                    cur.execute("SET LOCAL maintenance_work_mem = '512MB'")
+                    for index_def in index_defs:
+                        cur.execute(index_def)
+            finally:
+                cur.close()
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+    return int(rows)
+
+
+def _insert_execute_values(pd_table, conn, keys, data_iter) -> int:
+    """
+    method= para DataFrame.to_sql: INSERT multi-fila con execute_values
+    (páginas de 1000 filas, sin el límite de parámetros de method="multi").
+    """
+    target = f'"{pd_table.schema}"."{pd_table.name}"' if pd_table.schema else f'"{pd_table.name}"'
+    cols = ", ".join(f'"{k}"' for k in keys)
+    with conn.connection.cursor() as cur:
+        execute_values(cur, f"INSERT INTO {target} ({cols}) VALUES %s", data_iter, page_size=1000)
+        return cur.rowcount
+
+
 def load_csv_to_postgres(
     csv_path: Path | str,
     conn_url: Optional[str] = None,
@@ -66,43 +285,79 @@ def load_csv_to_postgres(
     chunksize: int = 10_000,
     sep: str = ",",
     encoding: str = "utf-8-sig",
+    engine: Optional[Engine] = None,
+    fast_load: bool = False,
 ) -> int:
     """
     Carga un CSV a PostgreSQL. Devuelve filas insertadas (aprox).
     Si conn_url es None, usa DATABASE_URL desde settings.py (.env).
+    Si se pasa engine, se reutiliza (y se asume el schema ya creado).
+    Crea la tabla a partir de una muestra y vuelca los datos con COPY;
+    si COPY falla, reintenta con to_sql + execute_values (INSERT multi-fila).
+    fast_load: ver _copy_csv (índices fuera durante el COPY, commit asíncrono).
     """
     csv_path = Path(csv_path).expanduser().resolve()
     if not csv_path.exists():
         raise FileNotFoundError(f"No existe el archivo: {csv_path}")
 
-    url = (conn_url or DATABASE_URL or "").strip()
-    if not url:
-        raise RuntimeError(
-            "DATABASE_URL no definida. Configura tu .env o pasa conn_url explícitamente."
+    if engine is None:
+        url = (conn_url or get_database_url()).strip()
+        if not url:
+            raise RuntimeError(
+                "DATABASE_URL no definida. Configura tu .env o pasa conn_url explícitamente."
+            )
+        engine = create_engine(url, pool_pre_ping=True)
+        _ensure_schema(engine, schema)
+
+    table = _resolve_table_name(csv_path, table_name)
+    with engine.connect() as conn:
+        table_exists = engine.dialect.has_table(conn, table, schema=schema)
+
+    # Append sobre una tabla existente: sus tipos mandan y PostgreSQL
+    # convierte el texto al insertar, así que no se infiere nada.
+    skip_inference = table_exists and if_exists == "append"
+
+    if skip_inference:
+        header = pd.read_csv(csv_path, sep=sep, encoding=encoding, nrows=0)
+        columns = _normalize_columns(list(header.columns))
+    else:
+        # Muestra para inferir tipos y emitir el DDL
+        sample = pd.read_csv(
+            csv_path,
+            sep=sep,
+            encoding=encoding,
+            nrows=1000,
+            low_memory=False,
         )
+        sample.columns = _normalize_columns(list(sample.columns))
+        _infer_types_inplace(sample)
 
-    df = pd.read_csv(
-        csv_path,
-        sep=sep,
-        encoding=encoding,
-        low_memory=False,
-        dtype_backend="numpy_nullable" if hasattr(pd, "options") else None,
-    )
+        _ensure_table(engine, schema, table, sample, if_exists, table_exists)
+        columns = list(sample.columns)
 
-    df.columns = _normalize_columns(list(df.columns))
-    df = _infer_types(df)
+    try:
+        return _copy_csv(
+            engine, csv_path, schema, table, columns, sep, encoding, fast_load=fast_load
+        )
+    except Exception as e:
+        # Fallback: ruta pandas (INSERT con execute_values) si COPY no pudo con los datos
+        logger.warning(f"COPY falló para {schema}.{table} ({e}); reintentando con INSERT")
 
-    table = _resolve_table_name(csv_path, table_name)
-    engine = create_engine(url, pool_pre_ping=True)
-    _ensure_schema(engine, schema)
+    df = _read_full_csv(csv_path, sep, encoding)
+
+    df.columns = _normalize_columns(list(df.columns))
+    if not skip_inference:
+        _infer_types_inplace(df)
 
+    # Si la tabla se creó en esta llamada (DDL de la muestra) se recrea con los tipos del
+    # CSV completo: el mismo desajuste que rompió el COPY rompería el INSERT
     df.to_sql(
         name=table,
         con=engine,
         schema=schema,
-        if_exists=if_exists,
+        if_exists="append" if skip_inference else "replace",
         index=False,
-        method="multi",
+        method=_insert_execute_values,
         chunksize=chunksize,
     )
     return int(len(df))
@@ -114,14 +369,21 @@ def load_directory_to_postgres(
     schema: str = "public",
     if_exists: str = "append",
     recursive: bool = True,
-    sep: str = ",",
-    encoding: str = "utf-8-sig",
+    sep: Optional[str] = ",",
+    encoding: Optional[str] = "utf-8-sig",
+    workers: int = 4,
+    fast_load: bool = False,
 ) -> List[tuple[Path, int]]:
     """
     Carga todos los .csv de target_dir (recursivo por defecto).
+    Usa un único engine (y un único CREATE SCHEMA) para todos los archivos.
+    Los archivos se cargan en paralelo (hasta 'workers' hilos, una conexión
+    cada uno); los que van a la misma tabla se cargan en serie en un mismo hilo.
+    sep/encoding en None: se detectan una vez con el primer archivo y se
+    reutilizan para el resto.
     Retorna lista de tuplas [(ruta_csv, filas_insertadas)].
     """
-    url = (conn_url or DATABASE_URL or "").strip()
+    url = (conn_url or get_database_url()).strip()
     if not url:
         raise RuntimeError("DATABASE_URL no definida. Configura tu .env o pasa conn_url explícitamente.")
 
@@ -129,19 +391,52 @@ def load_directory_to_postgres(
     if not target.exists() or not target.is_dir():
         raise NotADirectoryError(f"Carpeta no válida: {target}")
 
-    pattern = "**/*.csv" if recursive else "*.csv"
-    paths = sorted(target.glob(pattern), key=lambda p: p.name.lower())
+    paths = [
+        Path(p)
+        for p in sorted(_iter_csvs(target, recursive), key=lambda p: os.path.basename(p).lower())
+    ]
 
-    results: List[tuple[Path, int]] = []
+    if paths and (sep is None or encoding is None):
+        sep, encoding = _sniff_csv(paths[0], sep, encoding)
+
+    # Agrupa por tabla destino: dos COPY/DDL sobre la misma tabla no deben competir
+    groups: Dict[str, List[Path]] = {}
     for p in paths:
-        rows = load_csv_to_postgres(
-            csv_path=p,
-            conn_url=url,
-            schema=schema,
-            table_name=None,    # usa stem normalizado como nombre de tabla
-            if_exists=if_exists,
-            sep=sep,
-            encoding=encoding,
-        )
-        results.append((p, rows))
-    return results
+        groups.setdefault(_resolve_table_name(p, None), []).append(p)
+    n_workers = max(1, min(workers, len(groups)))
+
+    engine = create_engine(
+        url,
+        pool_pre_ping=True,
+        pool_size=n_workers,
+        max_overflow=0,
+    )
+    _ensure_schema(engine, schema)
+
+    def _load_group(group: List[Path]) -> List[tuple[Path, int]]:
+        return [
+            (
+                p,
+                load_csv_to_postgres(
+                    csv_path=p,
+                    conn_url=url,
+                    schema=schema,
+                    table_name=None,    # usa stem normalizado como nombre de tabla
+                    if_exists=if_exists,
+                    sep=sep,
+                    encoding=encoding,
+                    engine=engine,
+                    fast_load=fast_load,
+                ),
+            )
+            for p in group
+        ]
+
+    rows_by_path: Dict[Path, int] = {}
+    try:
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            for loaded in executor.map(_load_group, groups.values()):
+                rows_by_path.update(loaded)
+    finally:
+        engine.dispose()
+    return [(p, rows_by_path[p]) for p in paths]
@@ -6,46 +6,158 @@ Genera 'missingfiles.txt' en la carpeta analizada.
 
 from __future__ import annotations
 
+import os
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
+# safe_name y _norm ya vienen memoizadas: los mismos nombres (y datasets) se
+# normalizan una vez aunque aparezcan en varias comparaciones/módulos.
 from src.utils.expectedfiles import get_expected_datasets, safe_name, _norm
 
 
+def _scandir_csvs(root: str) -> Iterator[str]:
+    """
+    Nombres de los CSV bajo root (recursivo, os.scandir). Mismo conjunto que
+    rglob("*.csv"): '.csv' distingue mayúsculas y los symlinks se listan pero no
+    se recorren.
+    """
+    try:
+        with os.scandir(root) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from _scandir_csvs(entry.path)
+                elif entry.name.endswith(".csv"):
+                    yield entry.name
+    except (PermissionError, FileNotFoundError):
+        return
+
+
 def scan_downloaded_filenames(downloads_root: Path) -> List[str]:
     """Recolecta nombres de todos los CSV bajo downloads_root (recursivo)."""
     if not downloads_root.exists() or not downloads_root.is_dir():
         return []
-    return [p.name for p in downloads_root.rglob("*.csv")]
+    return [name for name in _scandir_csvs(str(downloads_root))]
 
 
-def matches_any_expected(filename_norm: str, expected: List[str]) -> bool:
-    """True si filename_norm coincide con algún dataset esperado (crudo/safe, exacto/prefijo)."""
+def expected_patterns(expected: Iterable[str]) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+    """
+    Precalcula, una sola vez, las formas normalizadas de los esperados:
+      - exactos:  {"{dataset}.csv" | "{safe_name(dataset)}.csv": [datasets]}
+      - prefijos: {"{dataset}_" | "{safe_name(dataset)}_": [datasets]}
+    """
+    exact: Dict[str, List[str]] = {}
+    prefixes: Dict[str, List[str]] = {}
     for ds in expected:
-        raw_base = ds
         safe_base = safe_name(ds)
-        if (
-            filename_norm == _norm(f"{raw_base}.csv")
-            or filename_norm == _norm(f"{safe_base}.csv")
-            or filename_norm.startswith(_norm(f"{raw_base}_"))
-            or filename_norm.startswith(_norm(f"{safe_base}_"))
-        ):
-            return True
-    return False
+        for key in {_norm(f"{ds}.csv"), _norm(f"{safe_base}.csv")}:
+            exact.setdefault(key, []).append(ds)
+        for key in {_norm(f"{ds}_"), _norm(f"{safe_base}_")}:
+            prefixes.setdefault(key, []).append(ds)
+    return exact, prefixes
+
+
+# Clave de nodo terminal en el trie (nunca choca con una clave de 1 carácter)
+_TRIE_END = ""
+
+
+def build_prefix_trie(prefixes: Dict[str, List[str]]) -> dict:
+    """Trie dict-de-dicts por carácter; cada prefijo completo guarda sus datasets en _TRIE_END."""
+    root: dict = {}
+    for pref, datasets in prefixes.items():
+        node = root
+        for ch in pref:
+            node = node.setdefault(ch, {})
+        node.setdefault(_TRIE_END, []).extend(datasets)
+    return root
+
+
+def trie_prefix_matches(trie: dict, name: str, first_only: bool = False) -> List[str]:
+    """
+    Datasets cuyo prefijo es prefijo de 'name', recorriendo name una sola vez:
+    O(len(name)) sin importar cuántos esperados haya.
+    """
+    out: List[str] = []
+    node = trie
+    for ch in name:
+        node = node.get(ch)
+        if node is None:
+            break
+        if _TRIE_END in node:
+            out.extend(node[_TRIE_END])
+            if first_only:
+                break
+    return out
+
+
+# (exactos, trie de prefijos, tupla de prefijos) de una lista de esperados
+ExpectedIndex = Tuple[Dict[str, List[str]], dict, Tuple[str, ...]]
+
+
+@lru_cache(maxsize=32)
+def _expected_index(expected_key: Tuple[str, ...]) -> ExpectedIndex:
+    """
+    (exactos, trie de prefijos, tupla de prefijos) para una lista de esperados; memoizado.
+    La tupla sirve para las preguntas sí/no: str.startswith(tupla) recorre los prefijos en C.
+    """
+    exact, prefixes = expected_patterns(expected_key)
+    return exact, build_prefix_trie(prefixes), tuple(prefixes)
+
+
+def expected_index(expected: Iterable[str]) -> ExpectedIndex:
+    """
+    Índice de esperados para reutilizar entre llamadas: se pasa como 'index='
+    a matches_any_expected / compute_extras / compute_missing / match_present
+    y evita rearmar (u ordenar para buscar en caché) la lista en cada una.
+    """
+    return _expected_index(tuple(sorted(expected)))
+
+
+def matches_any_expected(
+    filename_norm: str, expected: Iterable[str], index: Optional[ExpectedIndex] = None
+) -> bool:
+    """True si filename_norm coincide con algún dataset esperado (crudo/safe, exacto/prefijo)."""
+    exact, _, prefix_tuple = index or expected_index(expected)
+    return filename_norm in exact or filename_norm.startswith(prefix_tuple)
+
 
+def matches_expected(filename: str, scope: str = "all") -> Optional[str]:
+    """
+    Dataset esperado (del scope) al que corresponde 'filename', o None. Exacto por
+    diccionario y, si no, un solo recorrido del trie de prefijos sobre el nombre
+    (gana el prefijo más largo).
+    """
+    exact, trie, _ = expected_index(get_expected_datasets(scope))
+    name = _norm(filename)
+    if name in exact:
+        return exact[name][0]
+    # El prefijo más largo gana: "X_" no debe tapar a "X_percentil_98_"
+    hits = trie_prefix_matches(trie, name)
+    return hits[-1] if hits else None
 
-def compute_extras(expected_all: List[str], present_filenames: List[str]) -> List[str]:
+
+def compute_extras(
+    expected_all: Iterable[str],
+    present_filenames: List[str],
+    index: Optional[ExpectedIndex] = None,
+) -> List[str]:
     """Devuelve la lista de archivos CSV presentes que NO corresponden a ningún esperado."""
-    present_norm = [_norm(name) for name in present_filenames]
+    exact, _, prefix_tuple = index or expected_index(expected_all)
     extras: List[str] = []
-    for orig_name, norm_name in zip(present_filenames, present_norm):
-        if not matches_any_expected(norm_name, expected_all):
-            extras.append(orig_name)
+    for orig_name in present_filenames:
+        norm_name = _norm(orig_name)
+        if norm_name in exact or norm_name.startswith(prefix_tuple):
+            continue
+        extras.append(orig_name)
     return extras
 
 
-def compute_missing(expected: List[str], present_filenames: List[str]) -> List[str]:
+def compute_missing(
+    expected: Iterable[str],
+    present_filenames: List[str],
+    index: Optional[ExpectedIndex] = None,
+) -> List[str]:
     """
     Un dataset se considera 'presente' si existe al menos uno de estos patrones en los archivos:
       - exacto crudo:  "{dataset}.csv"
@@ -54,60 +166,110 @@ def compute_missing(expected: List[str], present_filenames: List[str]) -> List[s
       - prefijo safe:  "{safe_name(dataset)}_..."
     Comparación normalizada y case-insensitive.
     """
-    present_norm = [_norm(name) for name in present_filenames]
-    missing: List[str] = []
+    expected = list(expected)
+    exact, trie, _ = index or expected_index(expected)
+    present_norm = {_norm(name) for name in present_filenames}
 
-    for ds in expected:
-        raw_base = ds
-        safe_base = safe_name(ds)
+    # Exactos: intersección de conjuntos
+    found = set()
+    for key in present_norm & exact.keys():
+        found.update(exact[key])
 
-        candidates_exact = {_norm(f"{raw_base}.csv"), _norm(f"{safe_base}.csv")}
-        candidates_prefix = {_norm(f"{raw_base}_"), _norm(f"{safe_base}_")}
+    # Prefijos: un recorrido del trie por nombre presente, y se corta en cuanto
+    # ya no queda ningún esperado por encontrar. Solo cuentan los de 'expected':
+    # un index más amplio (p. ej. el de todos los scopes) trae otros nombres
+    expected_set = set(expected)
+    found &= expected_set
+    if len(found) < len(expected_set):
+        for n in present_norm:
+            hits = trie_prefix_matches(trie, n)
+            if hits:
+                found.update(h for h in hits if h in expected_set)
+                if len(found) == len(expected_set):
+                    break
 
-        found = any(n in candidates_exact for n in present_norm) or \
-                any(any(n.startswith(pref) for n in present_norm) for pref in candidates_prefix)
+    return [ds for ds in expected if ds not in found]
 
-        if not found:
-            missing.append(ds)
 
-    return missing
+def match_present(
+    expected_all: Iterable[str],
+    present_filenames: List[str],
+    index: Optional[ExpectedIndex] = None,
+) -> Tuple[set, List[str]]:
+    """
+    Una sola pasada sobre los presentes contra todos los esperados:
+    devuelve (datasets encontrados, archivos extra). Los faltantes de cada
+    módulo salen luego con un simple 'ds not in found'.
+    """
+    exact, trie, _ = index or expected_index(expected_all)
+    found: set = set()
+    extras: List[str] = []
+    for orig_name in present_filenames:
+        n = _norm(orig_name)
+        hits = exact.get(n)
+        if hits:
+            found.update(hits)
+        pref_hits = trie_prefix_matches(trie, n)
+        if pref_hits:
+            found.update(pref_hits)
+        elif not hits:
+            extras.append(orig_name)
+    return found, extras
 
 
-def write_missing_report(
+def _emit_report_lines(
     target_dir: Path,
     missing_by_module: Dict[str, List[str]],
     extras: List[str],
-) -> Path:
-    """Crea missingfiles.txt con faltantes por módulo y sección de archivos extra."""
-    target_dir.mkdir(parents=True, exist_ok=True)
-    out_path = target_dir / "missingfiles.txt"
-    lines: List[str] = []
-    total_missing = sum(len(v) for v in missing_by_module.values())
+    total_missing: int,
+) -> Iterator[str]:
+    """Genera, línea a línea, el contenido de missingfiles.txt."""
     stamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    lines.append(f"REPORTE DE ARCHIVOS FALTANTES - generado {stamp}")
-    lines.append(f"Carpeta analizada: {target_dir}")
-    lines.append("=" * 72)
+    yield f"REPORTE DE ARCHIVOS FALTANTES - generado {stamp}"
+    yield f"Carpeta analizada: {target_dir}"
+    yield "=" * 72
     for module, items in missing_by_module.items():
-        lines.append(f"[{module}]  Faltantes: {len(items)}")
+        yield f"[{module}]  Faltantes: {len(items)}"
         if items:
-            lines.extend(f" - {name}" for name in items)
+            yield from (f" - {name}" for name in items)
         else:
-            lines.append(" - (sin faltantes)")
-        lines.append("")
-    lines.append("-" * 72)
-    lines.append(f"TOTAL FALTANTES: {total_missing}")
-    lines.append("=" * 72)
-    lines.append("")
-    lines.append("ARCHIVOS CSV EXTRA (no esperados)")
-    lines.append(f"Total extras: {len(extras)}")
+            yield " - (sin faltantes)"
+        yield ""
+    yield "-" * 72
+    yield f"TOTAL FALTANTES: {total_missing}"
+    yield "=" * 72
+    yield ""
+    yield "ARCHIVOS CSV EXTRA (no esperados)"
+    yield f"Total extras: {len(extras)}"
     if extras:
-        lines.extend(f" - {x}" for x in sorted(extras))
+        yield from (f" - {x}" for x in extras)
     else:
-        lines.append(" - (sin extras)")
-    lines.append("=" * 72)
+        yield " - (sin extras)"
+    yield "=" * 72
 
-    out_path.write_text("\n".join(lines), encoding="utf-8")
+
+def write_missing_report(
+    target_dir: Path,
+    missing_by_module: Dict[str, List[str]],
+    extras: List[str],
+    total_missing: Optional[int] = None,
+) -> Path:
+    """
+    Crea missingfiles.txt con faltantes por módulo y sección de archivos extra.
+    'extras' se escribe en el orden recibido (handle_missingfiles lo pasa ya ordenado).
+    """
+    if total_missing is None:
+        total_missing = sum(map(len, missing_by_module.values()))
+    target_dir.mkdir(parents=True, exist_ok=True)
+    out_path = target_dir / "missingfiles.txt"
+    # Escritura en streaming: sin lista de líneas ni string unido en memoria
+    with out_path.open("w", encoding="utf-8") as f:
+        f.writelines(
+            line + "\n" for line in _emit_report_lines(
+                target_dir, missing_by_module, extras, total_missing
+            )
+        )
     return out_path
 
 
@@ -119,7 +281,7 @@ def handle_missingfiles(target_dir: Path, scope: str = "all") -> int:
 
     present = scan_downloaded_filenames(target_dir)
 
-    modules: List[Tuple[str, List[str]]] = []
+    modules: List[Tuple[str, Tuple[str, ...]]] = []
     expected_all: List[str] = []
     if scope in ("all", "aire"):
         aire = get_expected_datasets("aire")
@@ -130,15 +292,19 @@ def handle_missingfiles(target_dir: Path, scope: str = "all") -> int:
         modules.append(("Módulo VBA - Estado - Agua", agua))
         expected_all.extend(agua)
 
+    # safe_name/_norm de cada esperado se calculan una vez, aquí
+    index = expected_index(expected_all)
+    found, extras = match_present(expected_all, present, index=index)
     missing_by_module: Dict[str, List[str]] = {
-        module_name: compute_missing(expected_list, present)
+        module_name: [ds for ds in expected_list if ds not in found]
         for module_name, expected_list in modules
     }
 
-    extras = compute_extras(expected_all, present)
+    # Ordenados una vez para consola y archivo
+    sorted_extras = sorted(extras)
+    total_missing = sum(map(len, missing_by_module.values()))
 
     # Consola
-    total_missing = sum(len(v) for v in missing_by_module.values())
     print("=" * 72)
     print("🔎 Verificación de faltantes")
     print(f"📁 Carpeta: {target_dir}")
@@ -150,13 +316,13 @@ def handle_missingfiles(target_dir: Path, scope: str = "all") -> int:
     print("\n" + "-" * 72)
     print(f"TOTAL FALTANTES: {total_missing}")
     print(f"CSV EXTRAS (no esperados): {len(extras)}")
-    if extras:
-        for x in sorted(extras):
+    if sorted_extras:
+        for x in sorted_extras:
             print(f"  - {x}")
     print("=" * 72)
 
     # Archivo
-    out_path = write_missing_report(target_dir, missing_by_module, extras)
+    out_path = write_missing_report(target_dir, missing_by_module, sorted_extras, total_missing)
     print(f"\n📝 Archivo generado: {out_path}")
 
     # Exit code 0 si está perfecto; 2 si hay faltantes o extras
@@ -11,11 +11,14 @@ Ops: estandarización de nombres de archivos a identificadores PostgreSQL-safe.
 
 from __future__ import annotations
 
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from operator import attrgetter
+import os
 from pathlib import Path
-from typing import List, Tuple, Dict, Set
+from typing import List, NamedTuple, Optional, Tuple, Dict, Set
 import re
 import unicodedata
-from uuid import uuid4
 import time
 
 
@@ -29,17 +32,54 @@ POSTGRES_RESERVED = {
     "by","in","is","null","true","false"
 }
 
+# Marcas combinantes (tildes, diéresis, ...) de los bloques Unicode de diacríticos:
+# las que cubre el camino rápido de _asciiize
+_COMBINING_RANGES = [(0x0300, 0x0370), (0x1AB0, 0x1B00), (0x1DC0, 0x1E00),
+                     (0x20D0, 0x2100), (0xFE20, 0xFE30)]
+_COMBINING_TABLE = {
+    cp: None
+    for lo, hi in _COMBINING_RANGES
+    for cp in range(lo, hi)
+    if unicodedata.combining(chr(cp))
+}
+_NON_ALNUM_SUB = re.compile(r'[^a-z0-9]+').sub
+
+def _char_class(codepoints) -> str:
+    """Clase regex [...] con rangos contiguos de los code points dados."""
+    cps = sorted(codepoints)
+    parts = []
+    i = 0
+    while i < len(cps):
+        j = i
+        while j + 1 < len(cps) and cps[j + 1] == cps[j] + 1:
+            j += 1
+        parts.append(f"\\u{cps[i]:04x}" if i == j else f"\\u{cps[i]:04x}-\\u{cps[j]:04x}")
+        i = j + 1
+    return "".join(parts)
+
+# Algo que no sea ASCII ni marca de esos bloques: encode('ascii','ignore') lo
+# perdería, así que se usa el filtro completo con unicodedata.combining.
+_KEEPS_NON_ASCII = re.compile(f"[^\\x00-\\x7f{_char_class(_COMBINING_TABLE)}]").search
+
 def _asciiize(text: str) -> str:
     """Quita tildes/diacríticos y normaliza Unicode a ASCII."""
-    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
-
+    # ASCII puro ya es estable bajo NFKD: nada que hacer
+    if text.isascii():
+        return text
+    s = unicodedata.normalize('NFKD', text)
+    # Caso común (solo ASCII + tildes): el codec en C descarta las marcas
+    if not _KEEPS_NON_ASCII(s):
+        return s.encode('ascii', 'ignore').decode('ascii')
+    return ''.join(c for c in s if not unicodedata.combining(c))
+
+@lru_cache(maxsize=4096)
 def _to_snake_ascii(s: str) -> str:
     """ASCII, minúsculas, snake_case, sin dobles '__' ni guiones finales."""
     s = _asciiize(s).lower().strip()
-    s = re.sub(r'[^a-z0-9]+', '_', s)
-    s = re.sub(r'_+', '_', s).strip('_')
-    return s
+    # [^a-z0-9]+ incluye '_', así que las rachas de '_' ya quedan colapsadas
+    return _NON_ALNUM_SUB('_', s).strip('_')
 
+@lru_cache(maxsize=4096)
 def to_sql_identifier(raw: str, max_len: int = 63) -> str:
     """Convierte a identificador PostgreSQL-safe con límite 63 chars."""
     s = _to_snake_ascii(raw)
@@ -60,17 +100,19 @@ def to_sql_identifier(raw: str, max_len: int = 63) -> str:
 # Acepta '_' o '-', con espacios residuales al final
 _TS_RE  = re.compile(r'[\-_](\d{8})[\-_](\d{6})\s*$', re.UNICODE)
 _VER_RE = re.compile(r'_v(\d+)$', re.IGNORECASE)
+_TS_RE_search  = _TS_RE.search
+_VER_RE_search = _VER_RE.search
 
 def _strip_version(stem: str) -> tuple[str, int | None]:
     """Quita sufijo _vN si existe. Devuelve (stem_sin_v, N|None)."""
-    m = _VER_RE.search(stem)
+    m = _VER_RE_search(stem)
     if not m:
         return stem, None
     return stem[:m.start()], int(m.group(1))
 
 def _strip_timestamp(stem: str) -> tuple[str, str | None]:
     """Quita sufijo final timestamp (_YYYYMMDD_HHMMSS o -YYYYMMDD-HHMMSS)."""
-    m = _TS_RE.search(stem)
+    m = _TS_RE_search(stem)
     if not m:
         return stem, None
     ts = f"{m.group(1)}_{m.group(2)}"
@@ -83,9 +125,18 @@ def _parse_stem(stem: str) -> tuple[str, str | None, int | None]:
       - ts:   'YYYYMMDD_HHMMSS' si existía al final
       - ver:  entero si terminaba en _vN
     """
-    s, ver = _strip_version(stem)
-    base, ts = _strip_timestamp(s)
-    return base, ts, ver
+    # Equivale a _strip_version + _strip_timestamp, sin llamadas ni tuplas intermedias
+    ver_m = _VER_RE_search(stem)
+    if ver_m:
+        ver = int(ver_m.group(1))
+        s = stem[:ver_m.start()]
+    else:
+        ver = None
+        s = stem
+    ts_m = _TS_RE_search(s)
+    if ts_m:
+        return s[:ts_m.start()], f"{ts_m.group(1)}_{ts_m.group(2)}", ver
+    return s, None, ver
 
 def _ts_to_int(ts: str | None) -> int:
     """YYYYMMDD_HHMMSS -> entero comparable; None -> 0."""
@@ -161,6 +212,21 @@ _SEMANTIC_RULES: List[tuple[re.Pattern, str]] = [
 
 ]
 
+# Cada regla se guarda con la palabra literal con la que empieza su patrón
+# (obligatoria en cualquier match). Si esa palabra no está en el texto, la regla
+# no puede aplicar y se salta con un 'in' en C, sin recorrer el string con regex.
+# El orden y la semántica secuencial de las reglas se conservan: varias se
+# encadenan (p.ej. 'mensua' -> 'mensual' habilita 'media mensual').
+_LEADING_WORD_RE = re.compile(r'^(?:\^|\\b|\\s\*)*([a-z]+)(?![?*{])')
+
+def _rule_guard(pat: re.Pattern) -> str | None:
+    m = _LEADING_WORD_RE.match(pat.pattern)
+    return m.group(1) if m else None
+
+_GUARDED_RULES: List[tuple[str | None, re.Pattern, str]] = [
+    (_rule_guard(pat), pat, repl) for pat, repl in _SEMANTIC_RULES
+]
+
 # --------------------------------------------
 # Normalizaciones específicas post-reglas
 # --------------------------------------------
@@ -175,6 +241,7 @@ def _collapse_dup_prefix(s: str) -> str:
     return _DUP_PREFIX_RE.sub(r'\1_', s)
 
 
+@lru_cache(maxsize=4096)
 def semantic_shorten(raw: str) -> str:
     """
     Aplica reducción semántica robusta, manteniendo detalle útil.
@@ -197,9 +264,10 @@ def semantic_shorten(raw: str) -> str:
     # Normaliza MP 2.5 → MP2,5 para capturar regla
     s = re.sub(r'\(mp\s*2\.5\)', '(mp2,5)', s)
 
-    # Aplica reglas
-    for pat, repl in _SEMANTIC_RULES:
-        s = pat.sub(repl, s)
+    # Aplica reglas (saltando las que no pueden coincidir)
+    for guard, pat, repl in _GUARDED_RULES:
+        if guard is None or guard in s:
+            s = pat.sub(repl, s)
 
     # Limpieza de espacios
     s = re.sub(r'\s+', ' ', s).strip()
@@ -225,7 +293,29 @@ def semantic_shorten(raw: str) -> str:
 # Planificación de destinos (sin tocar disco)
 # --------------------------------------------
 
-def _plan_targets(paths: List[Path], drop_timestamp: bool) -> Dict[Path, Path]:
+# Desde cuántas bases distintas compensa arrancar procesos para las reglas
+_PARALLEL_MIN_BASES = 1000
+
+def _compute_names(base_raw: str) -> Tuple[str, str]:
+    """(base semántica, identificador SQL) de una base cruda."""
+    base_sem = semantic_shorten(base_raw)
+    return base_sem, to_sql_identifier(base_sem)
+
+
+class _Rec(NamedTuple):
+    """Registro compacto por archivo (tupla: acceso por índice en C, sin dict por fila)."""
+    path: Path
+    base_raw: str
+    base_sem: str
+    base_sql: str
+    ts: Optional[str]
+    ver: Optional[int]
+    ts_int: int
+    mtime: float
+    name_lower: str
+
+
+def _plan_targets(entries: List[os.DirEntry], drop_timestamp: bool) -> Dict[Path, Path]:
     """
     Calcula destinos {src -> dst}:
       - Reduce semánticamente y pasa a SQL-safe.
@@ -235,40 +325,55 @@ def _plan_targets(paths: List[Path], drop_timestamp: bool) -> Dict[Path, Path]:
       - Si drop_timestamp=False: conserva el timestamp en la clave y en el nombre.
     """
     # 1) Registros enriquecidos
-    recs = []
-    for p in paths:
-        stem = p.stem
-        base_raw, ts, ver = _parse_stem(stem)
-        base_sem = semantic_shorten(base_raw)
-        base_sql = to_sql_identifier(base_sem)
+    # Se parsean todos los stems y la cadena semántica + SQL-safe corre una vez
+    # por base distinta del lote (los hermanos con timestamp comparten base),
+    # sin depender de que la base siga en el lru_cache en directorios grandes.
+    paths = [Path(e.path) for e in entries]
+    parsed = [_parse_stem(p.stem) for p in paths]
+    unique_bases = list(dict.fromkeys(base_raw for base_raw, _, _ in parsed))
+    if len(unique_bases) >= _PARALLEL_MIN_BASES:
+        # Trabajo regex puro y sin estado compartido: se reparte entre núcleos
+        with ProcessPoolExecutor() as ex:
+            computed = list(ex.map(_compute_names, unique_bases, chunksize=128))
+    else:
+        computed = [_compute_names(b) for b in unique_bases]
+    names: Dict[str, Tuple[str, str]] = dict(zip(unique_bases, computed))
+
+    # El stat() de un DirEntry queda cacheado tras el primer acceso
+    recs: List[_Rec] = []
+    for e, p, (base_raw, ts, ver) in zip(entries, paths, parsed):
+        base_sem, base_sql = names[base_raw]
         try:
-            mtime = p.stat().st_mtime
-        except Exception:
+            mtime = e.stat().st_mtime
+        except OSError:
             mtime = time.time()
-        recs.append({
-            "path": p,
-            "base_raw": base_raw,
-            "base_sem": base_sem,
-            "base_sql": base_sql,
-            "ts": ts,
-            "ver": ver,
-            "ts_int": _ts_to_int(ts),
-            "mtime": mtime,
-        })
+        recs.append(_Rec(
+            path=p,
+            base_raw=base_raw,
+            base_sem=base_sem,
+            base_sql=base_sql,
+            ts=ts,
+            ver=ver,
+            ts_int=_ts_to_int(ts),
+            mtime=mtime,
+            name_lower=e.name.lower(),
+        ))
 
     # 2) Agrupa
-    groups: Dict[str, List[dict]] = {}
+    groups: Dict[str, List[_Rec]] = {}
     for r in recs:
         if drop_timestamp:
-            gkey = r["base_sql"]                       # sin timestamp
+            gkey = r.base_sql                       # sin timestamp
         else:
-            gkey = r["base_sql"] + (f"_{r['ts']}" if r["ts"] else "")  # con timestamp si existe
+            gkey = r.base_sql + (f"_{r.ts}" if r.ts else "")  # con timestamp si existe
         groups.setdefault(gkey, []).append(r)
 
     # 3) Dentro de cada grupo: ordena más reciente primero
     plan: Dict[Path, Path] = {}
     for gkey, items in groups.items():
-        items.sort(key=lambda r: (-r["ts_int"], -r["mtime"], r["path"].name.lower()))
+        # Dos sorts estables: nombre ascendente y luego (ts, mtime) descendente
+        items.sort(key=attrgetter("name_lower"))
+        items.sort(key=attrgetter("ts_int", "mtime"), reverse=True)
         # Base del grupo para el nombre final
         base = gkey
         for idx, r in enumerate(items, start=1):
@@ -276,25 +381,27 @@ def _plan_targets(paths: List[Path], drop_timestamp: bool) -> Dict[Path, Path]:
             if drop_timestamp:
                 # Cinturón y tirantes: si se coló un TS, lo quitamos del stem final
                 stem_final, _ = _strip_timestamp(stem_final)
-            dst = r["path"].with_name(f"{stem_final}.csv")
-            plan[r["path"]] = dst
+            dst = r.path.with_name(f"{stem_final}.csv")
+            plan[r.path] = dst
 
     # 4) Resolver colisiones globales entre grupos
-    used: Set[Path] = set()
+    # Todos los destinos comparten carpeta: se comparan stems (str) y el Path
+    # se construye solo para el destino elegido.
+    used_stems: Set[str] = set()
     for src, dst in list(plan.items()):
-        if dst not in used:
-            used.add(dst)
+        stem = dst.stem
+        if stem not in used_stems:
+            used_stems.add(stem)
             continue
         # colisión: versiona determinísticamente
-        base = dst.stem
-        m = _VER_RE.search(base)
-        base_wo_v = base[:m.start()] if m else base
+        m = _VER_RE_search(stem)
+        base_wo_v = stem[:m.start()] if m else stem
         n = 2
         while True:
-            alt = dst.with_name(f"{base_wo_v}_v{n}.csv")
-            if alt not in used:
-                plan[src] = alt
-                used.add(alt)
+            alt_stem = f"{base_wo_v}_v{n}"
+            if alt_stem not in used_stems:
+                plan[src] = dst.parent / f"{alt_stem}.csv"
+                used_stems.add(alt_stem)
                 break
             n += 1
 
@@ -321,11 +428,17 @@ def standardize_directory_names(
     if not target_dir.exists() or not target_dir.is_dir():
         return []
 
-    csv_paths = sorted(target_dir.glob("*.csv"), key=lambda p: p.name.lower())
-    if not csv_paths:
+    # Un único os.scandir: cada DirEntry trae tipo y stat() sin syscalls extra
+    with os.scandir(target_dir) as it:
+        csv_entries = [
+            e for e in it
+            if e.name.endswith(".csv") and e.is_file(follow_symlinks=False)
+        ]
+    if not csv_entries:
         return []
+    csv_entries.sort(key=lambda e: e.name.lower())
 
-    plan = _plan_targets(csv_paths, drop_timestamp=drop_timestamp)
+    plan = _plan_targets(csv_entries, drop_timestamp=drop_timestamp)
 
     # Filtra solo los que cambian
     changes = [(src, dst) for src, dst in plan.items() if src.name != dst.name]
@@ -335,27 +448,30 @@ def standardize_directory_names(
     if dry_run:
         return changes
 
-    # Fase 1: mover a temporales únicos
-    temp_map: Dict[Path, Path] = {}
-    for src, _ in changes:
-        tmp = src.with_name(f".__tmp__{uuid4().hex}__.csv")
-        src.rename(tmp)
-        temp_map[src] = tmp
+    # Fase 1: mover a temporales únicos (nombre transitorio: pid + contador)
+    parent_str = str(target_dir)
+    tmp_prefix = f".__tmp__{os.getpid()}_"
+    temp_map: Dict[Path, str] = {}
+    for i, (src, _) in enumerate(changes):
+        tmp_str = os.path.join(parent_str, f"{tmp_prefix}{i}__.csv")
+        os.rename(os.fspath(src), tmp_str)
+        temp_map[src] = tmp_str
 
     # Fase 2: temporales -> destino final
     for src, dst in changes:
-        tmp = temp_map[src]
-        if dst.exists():
+        tmp_str = temp_map[src]
+        dst_str = os.fspath(dst)
+        if os.path.exists(dst_str):
             base = dst.stem
-            m = _VER_RE.search(base)
+            m = _VER_RE_search(base)
             base_wo_v = base[:m.start()] if m else base
             n = 2
             while True:
-                alt = dst.with_name(f"{base_wo_v}_v{n}.csv")
-                if not alt.exists():
-                    dst = alt
+                alt_str = os.path.join(parent_str, f"{base_wo_v}_v{n}.csv")
+                if not os.path.exists(alt_str):
+                    dst_str = alt_str
                     break
                 n += 1
-        tmp.rename(dst)
+        os.rename(tmp_str, dst_str)
 
     return changes
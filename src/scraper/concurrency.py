@@ -0,0 +1,56 @@
+"""
+Control adaptativo de concurrencia (AIMD) para el pool de páginas del scraper
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+from loguru import logger  # ya configurado por src.utils.logger
+
+
+class AdaptiveSemaphore:
+    """
+    Semáforo con límite variable entre min_ y max_ (incremento aditivo, reducción
+    multiplicativa): cada éxito suma 1 al límite y cada fallo (timeout, descarga
+    fallida) lo divide por 2. Los workers esperan mientras los trabajos en curso
+    alcancen el límite actual.
+    """
+
+    def __init__(self, min_: int, max_: int, initial: Optional[int] = None,
+                 name: str = "", log_interval: float = 10.0):
+        self.min = max(1, min_)
+        self.max = max(self.min, max_)
+        self.cur = min(self.max, max(self.min, initial if initial is not None else self.min))
+        self.name = name
+        self._in_flight = 0
+        self._cond = asyncio.Condition()
+        self._log_interval = log_interval
+        self._last_log = time.monotonic()
+
+    async def acquire(self):
+        """Esperar a que haya cupo bajo el límite actual y tomarlo"""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < self.cur)
+            self._in_flight += 1
+
+    async def release(self, success: Optional[bool] = None):
+        """Liberar el cupo y ajustar el límite (None = sin señal, no ajusta)"""
+        async with self._cond:
+            self._in_flight -= 1
+            if success is True:
+                self.cur = min(self.cur + 1, self.max)
+            elif success is False:
+                self.cur = max(self.min, self.cur // 2)
+            self._maybe_log()
+            self._cond.notify_all()
+
+    def _maybe_log(self):
+        """Registrar el límite actual cada log_interval segundos"""
+        now = time.monotonic()
+        if now - self._last_log >= self._log_interval:
+            self._last_log = now
+            logger.info(
+                f"Concurrencia adaptativa {self.name}: {self.cur} "
+                f"(en curso {self._in_flight}, rango {self.min}-{self.max})"
+            )
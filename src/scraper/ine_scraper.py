@@ -3,21 +3,478 @@ Scraper para INE.Stat - Módulos de Agua y Aire
 """
 
 import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import shutil
 import time
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, NamedTuple, Optional, Sequence, Set, Tuple
 from datetime import datetime
 
-from playwright.async_api import async_playwright, Browser, Page, Download
+from playwright.async_api import async_playwright, Browser, BrowserContext, Locator, Page, Download
+from playwright.async_api import Error as PlaywrightError
 
 from config.settings import (
     BASE_URL, DATA_DIR, SCRAPER_CONFIG, BROWSER_CONFIG, 
-    MODULES_TO_SCRAPE
+    MODULES_TO_SCRAPE, BROWSER_STATE_FILE, EXPORT_REQUESTS_FILE, DOWNLOAD_CACHE_FILE
 )
+from src.scraper.concurrency import AdaptiveSemaphore
+from src.utils.expectedfiles import safe_name
 from src.utils.logger import get_logger
 
 logger = get_logger()
 
+# Señales de que el sitio terminó de cargar (unión CSS; :visible por candidato para
+# que cuente el primero visible y no el primero en el DOM)
+PAGE_LOAD_SELECTOR = ", ".join(f"{sel}:visible" for sel in [
+    ":text('Datos por tema')",
+    ":text('Data by topic')",
+    "[class*='sidebar']",
+    "[class*='menu']",
+    "h1",
+    ".main-content",
+    "#main",
+])
+
+# Selector compuesto del iframe de exportación (un único wait_for_selector en el navegador)
+IFRAME_SELECTORS = [
+    "iframe[id='DialogFrame']",
+    "iframe[src*='modalexports']",
+    "iframe[src*='export']",
+    "#DialogFrame",
+]
+IFRAME_COMPOSITE_SELECTOR = ", ".join(IFRAME_SELECTORS)
+
+# Opciones CSV del menú Exportar
+CSV_OPTIONS = (
+    "text=Text file (CSV)",
+    "text=Archivo de texto (CSV)",
+    "text=CSV",
+)
+
+# Botones de descarga dentro del iframe de exportación
+IFRAME_DOWNLOAD_SELECTORS = (
+    "input[value*='Descargar']",
+    "input[value*='Download']",
+    "button:has-text('Descargar')",
+    "button:has-text('Download')",
+    "input[type='button']",
+    "input[type='submit']",
+    "button[type='submit']",
+    "button",
+    "*[onclick*='download']",
+    "*[onclick*='export']",
+)
+
+# Botones de descarga directa en la página principal
+DIRECT_DOWNLOAD_SELECTORS = (
+    "input[value*='Descargar']",
+    "button:has-text('Descargar')",
+    "text=Descargar",
+    "*[onclick*='download']",
+    "*[onclick*='export']",
+    ".download-button",
+    "#download",
+    "#export",
+)
+
+# Botón Descargar del modal (dialog-content / jQuery UI)
+MODAL_DOWNLOAD_SELECTORS = (
+    # Botones específicos dentro del dialog-content dinámico (lo más específico primero)
+    "#dialog-content input[value='Descargar']",
+    "#dialog-content button:has-text('Descargar')",
+    "#dialog-content input[value*='Descargar']",
+    "#dialog-content input[type='button']",
+    "#dialog-content button[type='button']",
+    "#dialog-content input[type='submit']",
+    "#dialog-content button",
+
+    # Botones dentro de modales jQuery UI
+    ".ui-dialog input[value*='Descargar']",
+    ".ui-dialog button:has-text('Descargar')",
+    ".ui-dialog input[type='button']",
+    ".ui-dialog button[type='button']",
+
+    # Botones generales con texto "Descargar"
+    "input[value='Descargar']",
+    "button:has-text('Descargar')",
+    "input[value*='Descargar']",
+)
+
+# Fallback semántico tras MODAL_DOWNLOAD_SELECTORS (en vez de 'button:visible'):
+# botones por rol ARIA cuyo nombre contenga "Descargar" ("Descargar archivo", ...)
+MODAL_DOWNLOAD_ROLE_NAME = re.compile(r"Descargar", re.I)
+MODAL_DOWNLOAD_ROLE_LABEL = "role=button[name=/Descargar/i]"
+
+# Estado de todos los elementos de un locator en un solo RPC (en vez de is_visible,
+# is_enabled, text_content y get_attribute por elemento)
+ELEMENT_STATES_JS = """
+els => els.map(el => {
+    const style = window.getComputedStyle(el);
+    return {
+        tag: el.tagName.toLowerCase(),
+        type: el.getAttribute('type'),
+        text: el.textContent || '',
+        value: el.getAttribute('value') || '',
+        visible: el.getClientRects().length > 0 && style.visibility !== 'hidden',
+        enabled: !el.disabled,
+    };
+})
+"""
+
+# Misma lectura de estado para varios selectores CSS puros en un solo evaluate:
+# recibe [selector, ...] y retorna [[estado, ...] | null (selector inválido), ...]
+CSS_CLICKABLE_JS = """
+selectors => selectors.map(sel => {
+    let els;
+    try { els = [...document.querySelectorAll(sel)]; } catch (_) { return null; }
+    return els.map(el => el.getClientRects().length > 0
+        && window.getComputedStyle(el).visibility !== 'hidden' && !el.disabled);
+})
+"""
+
+# Sintaxis propia de Playwright: estos selectores no sirven para querySelectorAll
+_PLAYWRIGHT_ONLY_SYNTAX = ("text=", ":has-text(", ":visible", ":text(", "xpath=", ">>", "role=")
+
+
+def _is_plain_css(selector: str) -> bool:
+    """True si el selector es CSS estándar (se puede evaluar con querySelectorAll)"""
+    return not any(token in selector for token in _PLAYWRIGHT_ONLY_SYNTAX)
+
+
+# Búsqueda del iframe de exportación dentro del navegador (para wait_for_function):
+# primero por selector conocido; si no, cualquier iframe accesible que tenga controles
+FIND_EXPORT_IFRAME_JS = """
+selector => {
+    const known = document.querySelector(selector);
+    if (known) return known;
+    return [...document.querySelectorAll('iframe')].find(f => {
+        try {
+            const d = f.contentDocument;
+            return d && d.querySelectorAll('input, button').length > 0;
+        } catch (_) { return false; }  // otro origen
+    }) || null;
+}
+"""
+
+# Fallback JS del iframe: prueba cada estrategia en orden dentro del navegador y
+# retorna el índice de la primera que encontró algo sobre qué actuar (-1 si ninguna)
+IFRAME_JS_FALLBACK = """
+() => {
+    const tries = [
+        () => document.querySelector('input[value*="Descargar"]'),
+        () => document.querySelector('input[type="button"]'),
+        () => document.querySelector('button'),
+        () => document.forms[0] && { click: () => document.forms[0].submit() },
+        () => [...document.querySelectorAll('*')].find(
+            el => el.onclick && el.onclick.toString().includes('download')),
+    ];
+    for (let i = 0; i < tries.length; i++) {
+        try {
+            const target = tries[i]();
+            if (target) { target.click(); return i; }
+        } catch (_) {}
+    }
+    return -1;
+}
+"""
+
+
+# Registro TSV de descargas de la corrida (junto a scraping_report.txt)
+DOWNLOAD_LOG_NAME = "downloads_log.tsv"
+
+# Plantillas del reporte de scraping (generate_summary_report)
+REPORT_RULE = "=" * 60
+REPORT_HEADER_TEMPLATE = (
+    "{rule}\nREPORTE DE SCRAPING INE.STAT - {timestamp}\n{rule}\n"
+    "Directorio de descargas: {downloads_dir}\n\n"
+)
+REPORT_MODULE_TEMPLATE = "Módulo: {name}\nModo: {mode}\nArchivos descargados: {count}\n\n"
+
+# {stem}_{YYYYmmdd}_{HHMMSS}[_vN].csv, como lo escribe _next_file_path
+_DOWNLOAD_NAME_RE = re.compile(r"^(.+)_\d{8}_\d{6}(?:_v\d+)?\.csv$", re.IGNORECASE)
+
+
+def _download_stem(dataset_name: str) -> str:
+    """
+    Nombre base del CSV para un dataset (antes del timestamp); mismo criterio que
+    --missingfiles (safe_name ya está memoizada)
+    """
+    return safe_name(dataset_name)
+
+
+def _copy_file(src: str, dst: Path) -> None:
+    """
+    Copiar src a dst. shutil.copyfile copia en el kernel cuando puede (os.sendfile
+    en Linux, fcopyfile en macOS) y si no, por bloques (1 MB en Windows)
+    """
+    shutil.copyfile(src, dst)
+
+
+def _move_download(src: str, dst: Path) -> None:
+    """Mover el temporal de Playwright a dst (rename); copia con buffer si cruza de disco"""
+    try:
+        os.replace(src, dst)
+    except OSError:
+        _copy_file(src, dst)
+
+
+def _link_file(src: str, dst: Path) -> None:
+    """Hard link de src en dst (mismo disco: sin copiar datos); si no se puede, copia"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        _copy_file(src, dst)
+
+
+def _write_text(path: Path, text: str) -> None:
+    """Escribir text en path (UTF-8); pensado para correr en un hilo con asyncio.to_thread"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _load_json_dict(path: Path) -> Dict[str, Dict]:
+    """Leer un caché JSON por dataset ({} si no existe o está dañado)"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+# Peticiones recientes que pueden originar una descarga (documentos/otros, no assets)
+EXPORT_REQUEST_TYPES = frozenset({"document", "other"})
+MAX_RECENT_REQUESTS = 64
+
+
+def _xpath_literal(text: str) -> str:
+    """Literal XPath 1.0 para 'text' (usa concat() si contiene ambos tipos de comillas)"""
+    if "'" not in text:
+        return f"'{text}'"
+    if '"' not in text:
+        return f'"{text}"'
+    parts = text.split("'")
+    return "concat(" + ", \"'\", ".join(f"'{part}'" for part in parts) + ")"
+
+
+def module_xpath(name: str) -> str:
+    """Selector del span de un módulo del árbol, anclado a los <li class='t ...'> del treeview"""
+    return f"xpath=//li[contains(@class, 't')]//span[normalize-space()={_xpath_literal(name)}]"
+
+
+# Spans del árbol de temas (mismo ámbito que module_xpath): las búsquedas por texto
+# recorren solo el treeview, no todos los spans de la página
+TREE_SPAN_SELECTOR = "li.t span"
+
+
+def module_li_xpath(name: str) -> str:
+    """Selector del <li> contenedor de un módulo (sin recorrer ancestros desde el span)"""
+    return f"xpath=//li[contains(@class, 't')][./span[normalize-space()={_xpath_literal(name)}]]"
+
+
+# Expansión de un módulo en un solo evaluate: abre los <li> ancestros cerrados (del
+# más externo al más interno) y luego el del módulo si no está abierto. Retorna
+# 'missing' (no hay span con ese texto), 'open' (ya abierto con datasets visibles)
+# o 'expanded' (se hicieron clicks)
+EXPAND_MODULE_JS = """
+(name) => {
+    const norm = text => (text || '').replace(/\\s+/g, ' ').trim();
+    const span = [...document.querySelectorAll('li.t span')].find(s => norm(s.textContent) === name);
+    if (!span) return 'missing';
+    const li = span.closest('li.t');
+    const isVisible = el => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    if (li.classList.contains('opened') && [...li.querySelectorAll('a.ds')].some(isVisible)) return 'open';
+    
+    const ancestors = [];
+    for (let p = li.parentElement && li.parentElement.closest('li.t'); p;
+         p = p.parentElement && p.parentElement.closest('li.t')) {
+        ancestors.unshift(p);
+    }
+    for (const p of ancestors) {
+        const toggle = p.classList.contains('closed') && p.querySelector(':scope > span');
+        if (toggle) toggle.click();
+    }
+    if (!li.classList.contains('opened')) span.click();
+    return 'expanded';
+}
+"""
+
+
+# Cierre de modales en el navegador: Escape, overlays, diálogos jQuery UI y botones
+# de cierre visibles. #dialog-content no se elimina: el sitio lo reutiliza para el
+# modal del siguiente dataset
+CLOSE_MODALS_JS = """
+() => {
+    document.dispatchEvent(new KeyboardEvent('keydown', {key: 'Escape', keyCode: 27, bubbles: true}));
+    
+    // Remover overlays que bloquean clicks
+    document.querySelectorAll('.ui-widget-overlay, .modal-backdrop').forEach(el => el.remove());
+    
+    // Cerrar diálogos jQuery UI
+    try {
+        if (typeof $ !== 'undefined') {
+            $('.ui-dialog-content').dialog('close');
+        }
+    } catch (_) {}
+    
+    // Ocultar cualquier elemento con position fixed que pueda ser overlay
+    document.querySelectorAll('[class*="overlay"]').forEach(el => {
+        if (el.style.position === 'fixed' || el.style.position === 'absolute') {
+            el.style.display = 'none';
+        }
+    });
+    
+    // Botones de cierre visibles de todos los diálogos apilados (sin repetir el
+    // ícono que está dentro de un botón ya clickeado)
+    const isVisible = el => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    const clicked = [];
+    document.querySelectorAll(".ui-dialog-titlebar-close, .ui-icon-closethick, [title='close']").forEach(btn => {
+        if (isVisible(btn) && !clicked.some(prev => prev.contains(btn))) {
+            clicked.push(btn);
+            btn.click();
+        }
+    });
+    
+    return [...document.querySelectorAll('.ui-dialog')].some(isVisible);
+}
+"""
+
+
+# Fallback JS del modal: primero el botón dentro del iframe DialogFrame (mismo origen),
+# luego botones Descargar del documento; retorna el índice del que se clickeó (-1 si ninguno)
+MODAL_JS_FALLBACK = """
+() => {
+    const frameDoc = () => {
+        const iframe = document.querySelector('#dialog-content iframe[id="DialogFrame"]')
+            || document.querySelector('iframe[id="DialogFrame"]');
+        if (!iframe) return null;
+        try {
+            return iframe.contentDocument || (iframe.contentWindow && iframe.contentWindow.document);
+        } catch (_) { return null; }  // otro origen
+    };
+    const tries = [
+        () => {
+            const doc = frameDoc();
+            return doc && (doc.querySelector('input[value*="Descargar"]')
+                || doc.querySelector('input[type="button"]') || doc.querySelector('button'));
+        },
+        () => document.querySelector('input[value="Descargar"]'),
+        () => [...document.querySelectorAll('input')].find(el => el.value && el.value.includes('Descargar')),
+        () => [...document.querySelectorAll('button')].find(el => el.textContent && el.textContent.includes('Descargar')),
+        () => document.querySelector('button'),
+    ];
+    for (let i = 0; i < tries.length; i++) {
+        try {
+            const target = tries[i]();
+            if (target) { target.click(); return i; }
+        } catch (_) {}
+    }
+    return -1;
+}
+"""
+
+
+# Helpers JS registrados una vez por contexto (add_init_script, en cada documento y
+# frame): luego se invocan por nombre sin reenviar el código en cada evaluate
+PAGE_HELPERS = {
+    "__ineCloseModals": CLOSE_MODALS_JS,
+    "__ineModalFallback": MODAL_JS_FALLBACK,
+    "__ineIframeFallback": IFRAME_JS_FALLBACK,
+    "__ineExpandModule": EXPAND_MODULE_JS,
+}
+PAGE_HELPERS_SCRIPT = "\n".join(
+    f"window.{name} = {source.strip()};" for name, source in PAGE_HELPERS.items()
+)
+
+
+async def _run_helper(target, name: str, arg=None):
+    """
+    Ejecutar el helper 'name' en target (página o frame) por nombre, con 'arg' como
+    argumento; si el documento no lo tiene (cargado antes de registrar el init
+    script), se envía el código completo.
+    """
+    result = await target.evaluate(f"(arg) => window.{name} ? window.{name}(arg) : null", arg)
+    if result is None:
+        result = await target.evaluate(PAGE_HELPERS[name], arg)
+    return result
+
+
+# Intervalo (ms) de sondeo de wait_for_function: por defecto es cada requestAnimationFrame
+# (~60 veces por segundo), de sobra para esperas de modales e iframes de varios segundos
+WAIT_FUNCTION_POLLING = 250
+
+# Extensiones bloqueadas por tipo de recurso (blocked_resource_types, ver _block_resources)
+BLOCKED_EXTENSIONS: Dict[str, Tuple[str, ...]] = {
+    "image": ("png", "jpg", "jpeg", "gif", "svg", "webp", "ico", "bmp"),
+    "font": ("woff", "woff2", "ttf", "otf", "eot"),
+    "media": ("mp4", "webm", "ogg", "mp3", "wav"),
+}
+
+# Pausa entre datasets (_settle): piso fijo (fracción del tope) y después hasta que la
+# página lleve SETTLE_QUIET_S sin peticiones en curso; se revisa cada SETTLE_POLL_S
+SETTLE_MIN_FRACTION = 1 / 3
+SETTLE_QUIET_S = 0.5
+SETTLE_POLL_S = 0.1
+
+# Volcado de la estructura del árbol para debug_page_structure (un solo evaluate):
+# spans con palabras clave entre los primeros 20, textos de los primeros 15 ítems del
+# treeview y cuántos spans del árbol contienen el texto de Medio Ambiente
+PAGE_STRUCTURE_JS = """
+({keys, treeSpan, env}) => {
+    const spans = [...document.querySelectorAll('span')];
+    const spanHits = spans.slice(0, 20)
+        .map((e, i) => [i, e.textContent])
+        .filter(([_, t]) => t && keys.some(k => t.includes(k)));
+    const tree = [...document.querySelectorAll('.treeview span')];
+    const treeTexts = tree.slice(0, 15)
+        .map((e, i) => [i, (e.textContent || '').trim()])
+        .filter(([_, t]) => t);
+    const envCount = [...document.querySelectorAll(treeSpan)]
+        .filter(e => (e.textContent || '').includes(env)).length;
+    return {nSpans: spans.length, spanHits, nTree: tree.length, treeTexts, envCount};
+}
+"""
+
+# Contenido del modal de exportación ya cargado (HTML no vacío), para wait_for_function
+DIALOG_READY_JS = """
+() => {
+    const d = document.querySelector('#dialog-content');
+    return !!d && d.innerHTML.trim().length > 0;
+}
+"""
+
+# Texto y HTML del modal en un solo RPC (volcado verbose de download_csv)
+DIALOG_DUMP_JS = "el => [el.textContent || '', el.innerHTML]"
+
+# Textos no vacíos de los enlaces de datasets (evaluate_all sobre a.ds)
+DATASET_TEXTS_JS = "els => els.map(e => (e.textContent || '').trim()).filter(Boolean)"
+
+
+class ModuleInfo(NamedTuple):
+    """Módulo a scrapear (nombre en el árbol y datasets configurados; vacío = auto-descubrimiento)"""
+    name: str
+    datasets: Tuple[str, ...]
+
+
+# MODULES_TO_SCRAPE (dicts editables en settings) resuelto una vez al importar
+MODULES: Dict[str, ModuleInfo] = {
+    key: ModuleInfo(info["name"], tuple(info["datasets"]))
+    for key, info in MODULES_TO_SCRAPE.items()
+}
+MODULE_KEYS: Tuple[str, ...] = tuple(MODULES)
+
+
+def _is_export_frame(frame) -> bool:
+    """True si el frame es el iframe del modal de exportación (DialogFrame / modalexports)"""
+    url = frame.url or ""
+    return frame.name == "DialogFrame" or "modalexports" in url or "export" in url.lower()
+
+
 class INEScraper:
     """Scraper para el sitio INE.Stat"""
     
@@ -29,15 +486,66 @@ class INEScraper:
             browser_config: Configuración personalizada del navegador
             scraper_config: Configuración personalizada del scraper
         """
+        self._playwright = None
         self.browser: Optional[Browser] = None
         self.page: Optional[Page] = None
-        self.downloads_dir = DATA_DIR / "downloads" / datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.downloads_dir.mkdir(parents=True, exist_ok=True)
+        # Locators por página (se construyen una vez y se reutilizan)
+        self._locators: Dict[Page, Dict[str, Locator]] = {}
+        # Tráfico por página: [peticiones en curso, último cambio (monotonic)] (ver _settle)
+        self._net_activity: Dict[Page, List[float]] = {}
+        # Selector ganador por sondeo ("csv_option", "modal_download_btn", ...): se prueba primero
+        self._winning_selectors: Dict[str, str] = {}
+        # Páginas extra del pool por página guía de módulo (viven toda la corrida;
+        # con módulos en serie la guía es self.page y el pool se reutiliza entre módulos)
+        self._worker_pages: Dict[Page, List[Tuple[BrowserContext, Page]]] = {}
+        # Contextos abiertos en el navegador (tope: max_browser_contexts, ver _scrape_datasets_parallel)
+        self._open_contexts = 0
+        # Páginas que ya cargaron el sitio (no se vuelve a hacer goto)
+        self._loaded_pages: set = set()
+        # Guardado de descargas en segundo plano: save_download encola y retorna; un
+        # único _saver_task mueve los archivos mientras el navegador sigue trabajando
+        self._save_queue: Optional[asyncio.Queue] = None
+        self._start_lock: Optional[asyncio.Lock] = None  # se crea dentro del event loop
+        # Tope global de descargas simultáneas (compartido por los pools de cada módulo)
+        self._download_sem: Optional[asyncio.Semaphore] = None
+        self._saver_task: Optional[asyncio.Task] = None
+        self._failed_saves: Set[str] = set()
+        # Un timestamp por corrida: nombra la carpeta y todos los CSV de la corrida
+        self._batch_ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self._batch_stems: Dict[str, int] = {}  # stem -> veces guardado en esta corrida
+        # La carpeta se crea al escribir el primer archivo (_ensure_downloads_dir):
+        # una corrida sin descargas no deja carpetas vacías
+        self.downloads_dir = DATA_DIR / "downloads" / self._batch_ts
+        self._downloads_dir_ready = False
         
         # Usar configuraciones personalizadas o las por defecto
         self.browser_config = browser_config or BROWSER_CONFIG
         self.scraper_config = scraper_config or SCRAPER_CONFIG
         
+        # Volcados de DOM / screenshots de debug (solo con --debug o si se activan)
+        self._verbose = bool(self.scraper_config.get("verbose_debug", False))
+        
+        # Petición de exportación por dataset ({url, method, post_data, content_type}):
+        # se captura en la primera descarga por navegador y se repite en corridas siguientes
+        self._reuse_exports = bool(self.scraper_config.get("reuse_export_requests", False))
+        self._export_requests: Dict[str, Dict] = (
+            _load_json_dict(EXPORT_REQUESTS_FILE) if self._reuse_exports else {}
+        )
+        self._export_requests_dirty = False
+        # Último CSV por dataset ({path, etag, downloaded_at}); se registra siempre y se
+        # reutiliza si tiene menos de download_cache_ttl_hours (0 = descargar siempre)
+        self._cache_ttl = float(self.scraper_config.get("download_cache_ttl_hours", 0)) * 3600
+        self._download_cache: Dict[str, Dict] = _load_json_dict(DOWNLOAD_CACHE_FILE)
+        self._download_cache_dirty = False
+        self._disk_index: Optional[Dict[str, str]] = None  # ver _disk_downloads
+        # Registro incremental de la corrida (downloads_log.tsv, una línea por CSV
+        # guardado): sobrevive a una corrida interrumpida antes del reporte final
+        self._progress_log = None
+        self._dataset_modules: Dict[str, str] = {}  # dataset -> módulo (columna del registro)
+        self._persist_lock: Optional[asyncio.Lock] = None  # se crea dentro del event loop
+        # url -> (method, post_data, content-type) de las últimas peticiones candidatas
+        self._recent_requests: Dict[str, Tuple[str, Optional[str], Optional[str]]] = {}
+        
         # Log de configuración actual
         logger.info(f"Configuración del navegador: headless={self.browser_config.get('headless', True)}")
         logger.info(f"Configuración de timeouts: {self.scraper_config.get('timeout', 60000)}ms")
@@ -52,152 +560,288 @@ class INEScraper:
         await self.close_browser()
     
     async def start_browser(self):
-        """Inicializar el navegador"""
-        logger.info("Iniciando navegador...")
-        
-        playwright = await async_playwright().start()
-        self.browser = await playwright.chromium.launch(**self.browser_config)
-        
+        """Inicializar el navegador (idempotente: un solo Chromium por instancia)"""
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        # El lock evita que dos llamadas concurrentes lancen dos Chromium
+        async with self._start_lock:
+            if self.browser:
+                return
+            logger.info("Iniciando navegador...")
+            
+            self._playwright = await async_playwright().start()
+            self.browser = await self._playwright.chromium.launch(**self.browser_config)
+            
+            # Página principal (navegación, descubrimiento y descargas en serie)
+            _, self.page = await self._new_page()
+            
+            logger.info("Navegador iniciado correctamente")
+    
+    def _loc(self, page: Page, selector: str) -> Locator:
+        """Locator cacheado por (página, selector); evita reconstruirlo en cada llamada"""
+        cache = self._locators.setdefault(page, {})
+        locator = cache.get(selector)
+        if locator is None:
+            locator = cache[selector] = page.locator(selector)
+        return locator
+    
+    async def _first_visible(self, page: Page, selectors: Sequence[str], timeout: int) -> Optional[str]:
+        """
+        Carrera de wait_for(visible) sobre todos los selectores (asyncio.wait FIRST_COMPLETED);
+        retorna el primero en aparecer (desempate por orden en 'selectors') o None.
+        """
+        tasks = {
+            asyncio.ensure_future(self._loc(page, selector).first.wait_for(state="visible", timeout=timeout)): selector
+            for selector in selectors
+        }
+        pending = set(tasks)
+        winner = None
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                ok = [tasks[t] for t in done if not t.cancelled() and t.exception() is None]
+                if ok:
+                    winner = min(ok, key=selectors.index)
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        return winner
+    
+    def _winner_first(self, key: str, candidates: Sequence[str]) -> Sequence[str]:
+        """Candidatos con el selector que ganó la última vez (si hay) al frente"""
+        winner = self._winning_selectors.get(key)
+        if winner and winner in candidates:
+            return [winner] + [c for c in candidates if c != winner]
+        return candidates
+    
+    async def _new_page(self) -> Tuple[BrowserContext, Page]:
+        """Crear un contexto aislado (cookies/sesión propias) con su página"""
+        # Se cuenta antes del primer await: el chequeo del tope y la reserva no se
+        # intercalan entre pools de módulos concurrentes
+        self._open_contexts += 1
+        try:
+            return await self._create_context_page()
+        except BaseException:
+            self._open_contexts -= 1
+            raise
+    
+    async def _create_context_page(self) -> Tuple[BrowserContext, Page]:
+        """Cuerpo de _new_page: contexto configurado (descargas, viewport, filtros) y su página"""
         # Crear contexto con configuración de descarga
-        context = await self.browser.new_context(
+        context_options = dict(
             accept_downloads=True,
-            locale="es-CL"  # Configurar idioma chileno
+            locale="es-CL",  # Configurar idioma chileno
+            service_workers="block"  # sin fetches de fondo de service workers
         )
+        # Viewport fijo e igual en todos los contextos (el layout del árbol y del modal
+        # no cambia entre páginas del pool)
+        if self.scraper_config.get("viewport"):
+            context_options["viewport"] = dict(self.scraper_config["viewport"])
+        # Sesión de la corrida anterior (cookies, banners ya aceptados)
+        if self.scraper_config.get("persist_session") and BROWSER_STATE_FILE.exists():
+            try:
+                context = await self.browser.new_context(
+                    storage_state=str(BROWSER_STATE_FILE), **context_options
+                )
+            except Exception as e:
+                logger.warning(f"No se pudo cargar la sesión guardada ({e}), iniciando en limpio")
+                context = await self.browser.new_context(**context_options)
+        else:
+            context = await self.browser.new_context(**context_options)
+        
+        # Helpers JS (cierre de modales, fallbacks de descarga) disponibles en cada documento
+        await context.add_init_script(PAGE_HELPERS_SCRIPT)
+        
+        if self._reuse_exports:
+            context.on("request", self._remember_request)
         
-        self.page = await context.new_page()
+        page = await context.new_page()
+        self._track_network(page)
+        await self._block_resources(context, page)
         
         # Configurar timeouts usando la configuración personalizada
-        self.page.set_default_timeout(self.scraper_config["timeout"])
+        page.set_default_timeout(self.scraper_config["timeout"])
         
-        logger.info("Navegador iniciado correctamente")
+        return context, page
+    
+    async def _persist_json(self, path: Path, data: Dict) -> bool:
+        """Guardar un caché JSON fuera del event loop (temporal + os.replace); True si se escribió"""
+        tmp_path = path.with_name(path.name + ".tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            await asyncio.to_thread(_write_text, tmp_path, json.dumps(data, ensure_ascii=False, indent=2))
+            os.replace(tmp_path, path)
+            return True
+        except OSError as e:
+            logger.debug(f"No se pudo guardar {path}: {e}")
+            return False
+    
+    async def _persist_caches(self):
+        """
+        Guardar los cachés modificados (descargas y peticiones de exportación). Se llama
+        al terminar cada módulo, no solo al cerrar: una corrida interrumpida conserva
+        lo ya descargado. El lock evita dos escrituras del mismo archivo a la vez.
+        """
+        if self._persist_lock is None:
+            self._persist_lock = asyncio.Lock()
+        async with self._persist_lock:
+            if self._export_requests_dirty:
+                self._export_requests_dirty = not await self._persist_json(EXPORT_REQUESTS_FILE, self._export_requests)
+            if self._download_cache_dirty:
+                self._download_cache_dirty = not await self._persist_json(DOWNLOAD_CACHE_FILE, self._download_cache)
     
     async def close_browser(self):
         """Cerrar el navegador"""
+        # Los temporales de las descargas viven con el navegador: terminar de guardar antes
+        await self.flush_saves()
+        if self._saver_task:
+            self._saver_task.cancel()
+            self._saver_task = None
+            self._save_queue = None
+        await self._persist_caches()
+        if self._progress_log is not None:
+            self._progress_log.close()
+            self._progress_log = None
+        if self.page and self.scraper_config.get("persist_session"):
+            try:
+                BROWSER_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+                await self.page.context.storage_state(path=str(BROWSER_STATE_FILE))
+                logger.debug(f"Sesión del navegador guardada en {BROWSER_STATE_FILE}")
+            except Exception as e:
+                logger.debug(f"No se pudo guardar la sesión del navegador: {e}")
         if self.browser:
             try:
                 await self.browser.close()
                 logger.info("Navegador cerrado")
-            except:
-                pass
+            except PlaywrightError as e:
+                logger.debug(f"Error cerrando el navegador: {e}")
+        if self._playwright:
+            try:
+                await self._playwright.stop()
+            except PlaywrightError as e:
+                logger.debug(f"Error deteniendo Playwright: {e}")
+        # Estado ligado al navegador (permite volver a llamar start_browser)
+        self.browser = None
+        self.page = None
+        self._playwright = None
+        self._worker_pages.clear()
+        self._open_contexts = 0
+        self._loaded_pages.clear()
+        self._locators.clear()
+        self._net_activity.clear()
+        self._failed_saves.clear()
     
-    async def navigate_to_site(self):
+    async def navigate_to_site(self, page: Optional[Page] = None):
         """Navegar al sitio INE.Stat"""
+        page = page or self.page
+        if page in self._loaded_pages:
+            logger.debug("Sitio ya cargado en esta página, se reutiliza")
+            return
         logger.info(f"Navegando a {BASE_URL}")
         
         try:
-            await self.page.goto(BASE_URL, wait_until="networkidle")
-            logger.info("Sitio cargado correctamente")
-            
-            # Esperar a que la página esté completamente cargada
-            possible_selectors = [
-                "text=Datos por tema",
-                "text=Data by topic", 
-                "[class*='sidebar']",
-                "[class*='menu']",
-                "h1",
-                ".main-content",
-                "#main"
-            ]
-            
+            # domcontentloaded: la espera real es PAGE_LOAD_SELECTOR (networkidle además
+            # esperaba analítica y recursos que el scraping no usa)
+            started = time.perf_counter()
+            await page.goto(BASE_URL, wait_until="domcontentloaded", timeout=self.scraper_config["timeout"])
+            logger.info(f"Sitio cargado correctamente ({time.perf_counter() - started:.1f} s)")
+            
+            # Esperar a que la página esté completamente cargada: todos los candidatos en
+            # un único selector compuesto, resuelto en el navegador
             selector_found = None
-            for selector in possible_selectors:
-                try:
-                    await self.page.wait_for_selector(selector, timeout=5000)
-                    selector_found = selector
-                    logger.info(f"Página cargada - Selector encontrado: {selector}")
-                    break
-                except:
-                    logger.debug(f"Selector no encontrado: {selector}")
-                    continue
+            try:
+                selector_found = await page.wait_for_selector(PAGE_LOAD_SELECTOR, timeout=10000)
+                logger.info("Página cargada - Selector de contenido encontrado")
+            except Exception as e:
+                logger.debug(f"Selectores de carga no encontrados: {e}")
             
             if not selector_found:
-                await asyncio.sleep(5)
+                # Sin selector conocido: esperar la carga completa (tope 5 s) en vez de 5 s fijos
+                await self._wait_after_click(page, load_state="load", max_wait=5)
                 logger.warning("No se encontraron selectores específicos, continuando...")
             
-            # Capturar screenshot para debug
-            await self.page.screenshot(path=self.downloads_dir / "debug_page_load.png")
-            logger.info(f"Screenshot guardado en: {self.downloads_dir}/debug_page_load.png")
+            self._loaded_pages.add(page)
+            
+            # Capturar screenshot para debug (solo la página principal)
+            if page is self.page and self.scraper_config.get("debug_screenshots", False):
+                self._ensure_downloads_dir()
+                await page.screenshot(path=self.downloads_dir / "debug_page_load.png")
+                logger.info(f"Screenshot guardado en: {self.downloads_dir}/debug_page_load.png")
             
         except Exception as e:
             logger.error(f"Error al navegar al sitio: {e}")
             try:
-                await self.page.screenshot(path=self.downloads_dir / "error_page_load.png")
-            except:
-                pass
+                self._ensure_downloads_dir()
+                await page.screenshot(path=self.downloads_dir / "error_page_load.png")
+            except (PlaywrightError, OSError) as e:
+                logger.debug(f"No se pudo capturar screenshot de error: {type(e).__name__}: {e}")
             raise
     
-    async def debug_page_structure(self):
+    async def debug_page_structure(self, page: Optional[Page] = None):
         """Método de debug para ver la estructura de la página"""
+        if not self._verbose:
+            return
+        page = page or self.page
         logger.info("=== DEBUG: Analizando estructura de la página ===")
         
         try:
-            spans = await self.page.locator("span").all()
-            logger.info(f"Total de spans encontrados: {len(spans)}")
+            # Todo el volcado en un solo evaluate; el filtro por palabras clave corre en el navegador
+            info = await page.evaluate(PAGE_STRUCTURE_JS, {
+                "keys": ["VBA", "Módulo", "Estado"],
+                "treeSpan": TREE_SPAN_SELECTOR,
+                "env": "Estadísticas de Medio Ambiente",
+            })
+            logger.info(f"Total de spans encontrados: {info['nSpans']}")
             
-            for i, span in enumerate(spans[:20]):
-                text = await span.text_content()
-                if text and ("VBA" in text or "Módulo" in text or "Estado" in text):
-                    logger.info(f"Span {i}: '{text}'")
+            for i, text in info["spanHits"]:
+                logger.info(f"Span {i}: '{text}'")
             
-            tree_items = await self.page.locator(".treeview span").all()
-            logger.info(f"Items en treeview: {len(tree_items)}")
+            logger.info(f"Items en treeview: {info['nTree']}")
             
-            for i, item in enumerate(tree_items[:15]):
-                text = await item.text_content()
-                if text and text.strip():
-                    logger.info(f"TreeView {i}: '{text.strip()}'")
+            for i, text in info["treeTexts"]:
+                logger.info(f"TreeView {i}: '{text}'")
             
-            env_items = await self.page.locator("span").filter(has_text="Estadísticas de Medio Ambiente").all()
-            logger.info(f"Items de Medio Ambiente encontrados: {len(env_items)}")
+            logger.info(f"Items de Medio Ambiente encontrados: {info['envCount']}")
             
         except Exception as e:
             logger.error(f"Error en debug: {e}")
     
-    async def discover_available_datasets(self, module_name: str) -> List[str]:
+    async def discover_available_datasets(self, module_name: str, page: Optional[Page] = None) -> List[str]:
         """Descubrir automáticamente los datasets disponibles en un módulo específico"""
+        page = page or self.page
         logger.info(f"Descubriendo datasets disponibles en módulo: {module_name}")
         
         available_datasets = []
         
         try:
             # Expandir el módulo primero
-            if not await self.expand_module_section(module_name):
+            if not await self.expand_module_section(module_name, page):
                 logger.error(f"No se pudo expandir el módulo: {module_name}")
                 return available_datasets
             
-            # Esperar a que se carguen los datasets
-            await asyncio.sleep(3)
-            
-            # Buscar el elemento del módulo específico para delimitar la búsqueda
-            module_locator = self.page.locator(f"span").filter(has_text=module_name)
-            
-            if await module_locator.count() == 0:
-                logger.error(f"No se encontró el módulo: {module_name}")
-                return available_datasets
-            
-            # Encontrar el contenedor padre del módulo (li element)
-            module_li = module_locator.first.locator("xpath=ancestor::li[contains(@class, 't')]").first
+            # Contenedor del módulo (li element) localizado directamente por XPath anclado
+            module_li = self._loc(page, module_li_xpath(module_name)).first
             
             if await module_li.count() == 0:
                 logger.error(f"No se encontró el contenedor del módulo: {module_name}")
                 return available_datasets
             
             # Buscar SOLO los enlaces de datasets dentro de este módulo específico
-            dataset_links = await module_li.locator("a.ds").all()
-            logger.info(f"Enlaces de datasets encontrados en {module_name}: {len(dataset_links)}")
-            
-            for i, link in enumerate(dataset_links):
-                try:
-                    dataset_text = await link.text_content()
-                    if dataset_text and dataset_text.strip():
-                        clean_text = dataset_text.strip()
-                        if clean_text not in available_datasets:
-                            available_datasets.append(clean_text)
-                            logger.info(f"Dataset descubierto {i+1}: '{clean_text}'")
-                        
-                except Exception as e:
-                    logger.debug(f"Error procesando dataset link {i}: {e}")
-                    continue
+            # (todos los textos en un único RPC en vez de uno por enlace)
+            texts: List[str] = await module_li.locator("a.ds").evaluate_all(DATASET_TEXTS_JS)
+            logger.info(f"Enlaces de datasets encontrados en {module_name}: {len(texts)}")
+            
+            # De-duplicar conservando el orden de aparición; variantes de mayúsculas
+            # colapsan en la primera (que es el texto usado luego para seleccionar)
+            seen_names: Set[str] = set()
+            for text in texts:
+                key = text.casefold()
+                if key not in seen_names:
+                    seen_names.add(key)
+                    available_datasets.append(text)
+            for i, clean_text in enumerate(available_datasets):
+                logger.info(f"Dataset descubierto {i+1}: '{clean_text}'")
             
             logger.info(f"Total de datasets descubiertos en {module_name}: {len(available_datasets)}")
             
@@ -206,71 +850,64 @@ class INEScraper:
         
         return available_datasets
 
-    async def expand_module_section(self, module_name: str):
+    async def expand_module_section(self, module_name: str, page: Optional[Page] = None):
         """Expandir una sección específica del módulo"""
+        page = page or self.page
         logger.info(f"Expandiendo sección: {module_name}")
         
-        await self.debug_page_structure()
+        if self._verbose:
+            await self.debug_page_structure(page)
         
         try:
-            module_locator = self.page.locator(f"span").filter(has_text=module_name)
+            # Camino rápido: todo el recorrido del árbol en un evaluate; un módulo ya
+            # abierto no se vuelve a clickear (el click lo cerraría)
+            state = await _run_helper(page, "__ineExpandModule", module_name)
+            if state == "open":
+                logger.info(f"Módulo ya expandido: {module_name}")
+                return True
+            if state == "expanded":
+                await self._wait_module_datasets(self._loc(page, module_xpath(module_name)).first)
+                logger.info(f"Módulo expandido exitosamente: {module_name}")
+                return True
+            
+            # Sin coincidencia exacta: recorrido paso a paso y búsqueda por partes del nombre
+            # (click() ya verifica visibilidad/habilitado: sin is_visible() previos)
+            module_locator = self._loc(page, module_xpath(module_name))
             count = await module_locator.count()
             logger.info(f"Módulos encontrados con texto exacto: {count}")
             
             if count > 0:
                 first_match = module_locator.first
-                is_visible = await first_match.is_visible()
-                logger.info(f"Elemento visible: {is_visible}")
-                
-                if not is_visible:
-                    logger.info("Elemento no visible, buscando elemento padre para expandir...")
+                try:
+                    await first_match.click(timeout=2000)
+                except PlaywrightError:
+                    logger.info("Elemento no clickeable, buscando elemento padre para expandir...")
                     parent_li = first_match.locator("xpath=ancestor::li[@class='t closed' or @class='t opened']").first
-                    parent_count = await parent_li.count()
-                    
-                    if parent_count > 0:
-                        parent_span = parent_li.locator("span").first
-                        parent_text = await parent_span.text_content()
-                        logger.info(f"Expandiendo elemento padre: '{parent_text}'")
-                        
-                        await parent_span.click()
-                        await asyncio.sleep(3)
-                        
-                        is_visible_now = await first_match.is_visible()
-                        logger.info(f"Elemento visible después de expandir padre: {is_visible_now}")
-                
-                if await first_match.is_visible():
-                    await first_match.click()
-                    await asyncio.sleep(3)
-                    logger.info(f"Módulo expandido exitosamente: {module_name}")
-                    return True
-                else:
-                    logger.warning(f"Módulo aún no visible después de expandir padre: {module_name}")
-                    return False
-            
-            # Estrategia alternativa: buscar por partes del nombre
-            if "Aire" in module_name:
-                air_locator = self.page.locator("span").filter(has_text="Aire")
-                air_count = await air_locator.count()
-                logger.info(f"Elementos con 'Aire': {air_count}")
-                
-                for i in range(air_count):
-                    air_element = air_locator.nth(i)
-                    if await air_element.is_visible():
-                        await air_element.click()
-                        await asyncio.sleep(3)
-                        return True
-            
-            if "Agua" in module_name:
-                water_locator = self.page.locator("span").filter(has_text="Agua")
-                water_count = await water_locator.count()
-                logger.info(f"Elementos con 'Agua': {water_count}")
+                    if await parent_li.count() > 0:
+                        logger.info("Expandiendo elemento padre")
+                        await parent_li.locator(":scope > span").first.click()
+                    try:
+                        await first_match.click(timeout=5000)
+                    except PlaywrightError as e:
+                        logger.warning(f"Módulo aún no visible después de expandir padre: {module_name} ({e})")
+                        return False
                 
-                for i in range(water_count):
-                    water_element = water_locator.nth(i)
-                    if await water_element.is_visible():
-                        await water_element.click()
-                        await asyncio.sleep(3)
-                        return True
+                await self._wait_module_datasets(first_match)
+                logger.info(f"Módulo expandido exitosamente: {module_name}")
+                return True
+            
+            # Estrategia alternativa: primer span visible con parte del nombre (un solo click)
+            for part in ("Aire", "Agua"):
+                if part not in module_name:
+                    continue
+                part_match = self._loc(page, f"{TREE_SPAN_SELECTOR}:visible").filter(has_text=part).first
+                try:
+                    await part_match.click(timeout=2000)
+                except PlaywrightError as e:
+                    logger.debug(f"Sin elemento visible con '{part}': {e}")
+                    continue
+                await self._wait_module_datasets(part_match)
+                return True
             
             logger.warning(f"Módulo no encontrado o no clickeable: {module_name}")
             return False
@@ -279,34 +916,60 @@ class INEScraper:
             logger.error(f"Error al expandir módulo {module_name}: {e}")
             return False
     
-    async def select_dataset(self, dataset_name: str):
-        """Seleccionar un dataset específico"""
+    async def _wait_module_datasets(self, module_span: Locator, timeout: int = 5000):
+        """Esperar a que el módulo recién clickeado muestre sus enlaces de datasets"""
+        module_li = module_span.locator("xpath=ancestor::li[contains(@class, 't')]").first
+        try:
+            await module_li.locator("a.ds").first.wait_for(state="visible", timeout=timeout)
+        except Exception as e:
+            logger.debug(f"Datasets del módulo no visibles tras expandir: {e}")
+    
+    async def select_dataset(self, dataset_name: str, page: Optional[Page] = None) -> Optional[bool]:
+        """
+        Seleccionar un dataset específico: True si quedó seleccionado, None si no está
+        en el árbol y False si falló (timeout de la tabla, página cerrada, error)
+        """
+        page = page or self.page
         logger.info(f"Seleccionando dataset: {dataset_name}")
         
         try:
             # Verificar que el navegador y la página siguen activos
-            if not self.page or self.page.is_closed():
+            if not page or page.is_closed():
                 logger.warning("La página se cerró, saltando este dataset")
                 return False
             
             # Primero cerrar cualquier modal que pueda estar abierto
-            await self.force_close_all_modals()
+            await self.force_close_all_modals(page)
             
             # Buscar link del dataset por texto exacto
-            dataset_locator = self.page.locator(f"a.ds:has-text('{dataset_name}')")
+            dataset_locator = self._loc(page, f"a.ds:has-text('{dataset_name}')")
             
             if await dataset_locator.count() > 0:
                 await dataset_locator.click()
                 
-                # Esperar a que cargue la tabla de datos
-                await self.page.wait_for_selector("table", timeout=20000)
-                await asyncio.sleep(3)
+                # Esperar a que cargue la tabla de datos y, en paralelo, hacer hover sobre
+                # Exportar (está en el marco de la página antes que la tabla termine);
+                # no hace falta si la exportación se pedirá directo (caché)
+                hover_task = (
+                    asyncio.ensure_future(self._pre_hover_export(page, timeout=20000))
+                    if dataset_name not in self._export_requests else None
+                )
+                try:
+                    await self._wait_after_click(page, expect_selector="table", max_wait=20)
+                except BaseException:
+                    # Sin tabla el hover ya no sirve: cancelarlo en vez de esperar su timeout
+                    if hover_task:
+                        hover_task.cancel()
+                    raise
+                finally:
+                    if hover_task:
+                        await asyncio.gather(hover_task, return_exceptions=True)
                 
                 logger.info(f"Dataset seleccionado: {dataset_name}")
                 return True
             else:
                 logger.warning(f"Dataset no encontrado: {dataset_name}")
-                return False
+                return None
                 
         except Exception as e:
             logger.error(f"Error al seleccionar dataset {dataset_name}: {e}")
@@ -318,13 +981,27 @@ class INEScraper:
             
             return False
     
-    async def download_csv(self, dataset_name: str) -> Optional[str]:
+    async def _pre_hover_export(self, page: Page, timeout: int):
+        """Hover especulativo sobre Exportar mientras carga el dataset (un fallo no importa)"""
+        try:
+            await self._loc(page, "text=Exportar").first.hover(timeout=timeout)
+        except PlaywrightError as e:
+            logger.debug(f"Hover anticipado sobre Exportar no disponible: {e}")
+    
+    async def download_csv(self, dataset_name: str, page: Optional[Page] = None) -> Optional[str]:
         """Descargar CSV del dataset actual"""
+        page = page or self.page
         logger.info(f"Descargando CSV para: {dataset_name}")
         
+        # Petición de exportación ya conocida: pedir el CSV directo (sin modal ni iframe)
+        if dataset_name in self._export_requests:
+            file_path = await self._fetch_cached_export(dataset_name, page)
+            if file_path:
+                return file_path
+        
         try:
             # Buscar el botón de exportar
-            export_button = self.page.locator("text=Exportar")
+            export_button = self._loc(page, "text=Exportar")
             if await export_button.count() == 0:
                 logger.error("Botón Exportar no encontrado")
                 return None
@@ -332,27 +1009,23 @@ class INEScraper:
             # Hacer hover y click en CSV
             logger.info("Haciendo hover sobre el botón Exportar...")
             await export_button.hover()
-            await asyncio.sleep(2)
             
-            # Buscar opción CSV
-            csv_options = [
-                "text=Text file (CSV)",
-                "text=Archivo de texto (CSV)", 
-                "text=CSV"
-            ]
+            # Esperar en paralelo a que el menú muestre alguna opción CSV: gana la primera
+            # visible (a igualdad, la de mayor prioridad), sin probar opción por opción
+            candidates = self._winner_first("csv_option", CSV_OPTIONS)
+            csv_option = await self._first_visible(page, candidates, timeout=3000)
             
             csv_clicked = False
-            for csv_option in csv_options:
+            if csv_option:
                 try:
-                    csv_locator = self.page.locator(csv_option)
-                    if await csv_locator.count() > 0 and await csv_locator.first.is_visible():
-                        logger.info(f"Seleccionando opción CSV: {csv_option}")
-                        await csv_locator.first.click()
-                        csv_clicked = True
-                        break
+                    logger.info(f"Seleccionando opción CSV: {csv_option}")
+                    await self._loc(page, csv_option).first.click()
+                    self._winning_selectors["csv_option"] = csv_option
+                    csv_clicked = True
                 except Exception as e:
                     logger.debug(f"No se pudo usar selector {csv_option}: {e}")
-                    continue
+            else:
+                logger.debug("Menú CSV no visible tras hover")
             
             if not csv_clicked:
                 logger.warning("No se encontró opción CSV, intentando click directo en Exportar")
@@ -363,417 +1036,427 @@ class INEScraper:
             
             # Esperar a que aparezca el contenido del diálogo dinámicamente
             try:
-                await self.page.wait_for_selector("#dialog-content", timeout=10000)
+                await page.wait_for_selector("#dialog-content", timeout=10000)
                 logger.info("Modal dialog-content encontrado")
                 
-                # Esperar un poco más para que se cargue el contenido interno
-                await asyncio.sleep(3)
+                # Esperar a que se cargue el contenido interno (HTML no vacío)
+                try:
+                    await page.wait_for_function(DIALOG_READY_JS, polling=WAIT_FUNCTION_POLLING, timeout=5000)
+                except Exception as e:
+                    logger.debug(f"dialog-content sigue vacío: {e}")
                 
-                # Verificar si hay contenido en el modal
-                dialog_content = await self.page.locator("#dialog-content").text_content()
-                dialog_html = await self.page.locator("#dialog-content").inner_html()
-                logger.info(f"Contenido del modal dialog-content: '{dialog_content[:200]}...' (primeros 200 chars)")
-                logger.info(f"HTML del modal dialog-content: '{dialog_html[:500]}...' (primeros 500 chars)")
+                # Volcado del modal solo en modo verbose (son varios RPC y recorridos del DOM)
+                if self._verbose:
+                    # Verificar si hay contenido en el modal
+                    dialog_content, dialog_html = await self._loc(page, "#dialog-content").evaluate(DIALOG_DUMP_JS)
+                    logger.info(f"Contenido del modal dialog-content: '{dialog_content[:200]}...' (primeros 200 chars)")
+                    logger.info(f"HTML del modal dialog-content: '{dialog_html[:500]}...' (primeros 500 chars)")
+
+                    # También verificar si hay otros modales o dialogs activos
+                    # Solo conteos (count()), sin materializar un Locator por elemento
+                    n_visible_divs = await self._loc(page, "div:visible").count()
+                    logger.info(f"Total de divs visibles en la página: {n_visible_divs}")
+
+                    # Buscar cualquier elemento que contenga "Export" o "Descargar"; de los
+                    # de 'Export' se leen todos los estados en el mismo RPC que su conteo
+                    export_states, n_descargar, n_generate = await asyncio.gather(
+                        self._loc(page, "*:has-text('Export')").evaluate_all(ELEMENT_STATES_JS),
+                        self._loc(page, "*:has-text('Descargar')").count(),
+                        self._loc(page, "*:has-text('Generate')").count(),
+                    )
+
+                    logger.info(f"Elementos con 'Export': {len(export_states)}")
+                    logger.info(f"Elementos con 'Descargar': {n_descargar}")
+                    logger.info(f"Elementos con 'Generate': {n_generate}")
+
+                    # Si hay elementos con estos textos, mostrar información sobre ellos
+                    for i, state in enumerate(export_states[:3]):
+                        logger.info(f"Export elemento {i+1}: visible={state['visible']}, text='{state['text'][:100]}'")
+
                 
-                # También verificar si hay otros modales o dialogs activos
-                all_visible_divs = await self.page.locator("div:visible").all()
-                logger.info(f"Total de divs visibles en la página: {len(all_visible_divs)}")
+            except Exception as e:
+                logger.warning(f"No se pudo esperar a dialog-content: {e}")
+            
+            # Un único listener de descarga para toda la cascada: una descarga que llega
+            # tarde (disparada por una estrategia anterior) la recoge la siguiente. Sin
+            # timeout propio (0): cada intento acota su espera con _await_download y el
+            # listener se cancela al salir, así no vence a mitad de la cascada
+            async with self._download_listener(page, timeout=0) as download_waiter:
                 
-                # Buscar cualquier elemento que contenga "Export" o "Descargar"
-                export_elements = await self.page.locator("*:has-text('Export')").all()
-                descargar_elements = await self.page.locator("*:has-text('Descargar')").all()
-                generate_elements = await self.page.locator("*:has-text('Generate')").all()
+                async def late_download() -> Optional[str]:
+                    download = await self._await_download(download_waiter, 0)
+                    if download:
+                        logger.info("Descarga recibida de un intento anterior")
+                        return await self.save_download(download, dataset_name)
+                    return None
                 
-                logger.info(f"Elementos con 'Export': {len(export_elements)}")
-                logger.info(f"Elementos con 'Descargar': {len(descargar_elements)}")
-                logger.info(f"Elementos con 'Generate': {len(generate_elements)}")
+                # ESTRATEGIA 1 (PRIORITARIA): Manipulación JavaScript del modal
+                logger.info("=== ESTRATEGIA 1: Manipulación JavaScript (PRIORITARIA) ===")
+                result = await self.try_javascript_download_strategies(dataset_name, page, download_waiter)
+                if result:
+                    logger.info("JavaScript descarga exitosa, cerrando modales...")
+                    await self.force_close_all_modals(page)
+                    return result
                 
-                # Si hay elementos con estos textos, mostrar información sobre ellos
-                for i, elem in enumerate(export_elements[:3]):
-                    try:
-                        text = await elem.text_content()
-                        is_visible = await elem.is_visible()
-                        logger.info(f"Export elemento {i+1}: visible={is_visible}, text='{text[:100]}'")
-                    except:
-                        pass
+                # ESTRATEGIA 2: Esperar dinámicamente a que aparezca el iframe
+                logger.info("=== ESTRATEGIA 2: Esperando iframe dinámico ===")
+                iframe_found = await self.wait_for_dynamic_iframe(page=page)
                 
-            except Exception as e:
-                logger.warning(f"No se pudo esperar a dialog-content: {e}")
-                await asyncio.sleep(3)
-            
-            # ESTRATEGIA 1 (PRIORITARIA): Manipulación JavaScript del modal
-            logger.info("=== ESTRATEGIA 1: Manipulación JavaScript (PRIORITARIA) ===")
-            result = await self.try_javascript_download_strategies(dataset_name)
-            if result:
-                logger.info("JavaScript descarga exitosa, cerrando modales...")
-                await self.force_close_all_modals()
-                return result
-            
-            # ESTRATEGIA 2: Esperar dinámicamente a que aparezca el iframe
-            logger.info("=== ESTRATEGIA 2: Esperando iframe dinámico ===")
-            iframe_found = await self.wait_for_dynamic_iframe()
-            
-            if iframe_found:
-                result = await self.handle_iframe_download(iframe_found, dataset_name)
+                result = await late_download()
+                if not result and iframe_found:
+                    result = await self.handle_iframe_download(iframe_found, dataset_name, page, download_waiter)
                 if result:
                     logger.info("Iframe descarga exitosa, cerrando modales...")
-                    await self.force_close_all_modals()
+                    await self.force_close_all_modals(page)
+                    return result
+                
+                # ESTRATEGIA 3: Intentar descarga sin iframe (directa)
+                logger.info("=== ESTRATEGIA 3: Descarga directa sin iframe ===")
+                result = await late_download() or await self.try_direct_download_strategies(
+                    dataset_name, page, download_waiter
+                )
+                if result:
+                    logger.info("Descarga directa exitosa, cerrando modales...")
+                    await self.force_close_all_modals(page)
                     return result
-            
-            # ESTRATEGIA 3: Intentar descarga sin iframe (directa)
-            logger.info("=== ESTRATEGIA 3: Descarga directa sin iframe ===")
-            result = await self.try_direct_download_strategies(dataset_name)
-            if result:
-                logger.info("Descarga directa exitosa, cerrando modales...")
-                await self.force_close_all_modals()
-                return result
             
             logger.error("Todas las estrategias de descarga fallaron")
-            await self.force_close_all_modals()
+            await self.force_close_all_modals(page)
             return None
             
-        except Exception as e:
+        except (PlaywrightError, asyncio.TimeoutError) as e:
             logger.error(f"Error al descargar CSV para {dataset_name}: {e}")
-            await self.force_close_all_modals()
-            try:
-                await self.page.screenshot(path=self.downloads_dir / f"download_error_{dataset_name.replace(' ', '_')}.png")
-            except:
-                pass
+            await self.force_close_all_modals(page)
+            # Screenshot por dataset fallido solo en modo debug (un PNG por error)
+            if self.scraper_config.get("debug_screenshots", False):
+                try:
+                    self._ensure_downloads_dir()
+                    await page.screenshot(path=self.downloads_dir / f"download_error_{_download_stem(dataset_name)}.png")
+                except (PlaywrightError, OSError) as shot_error:
+                    logger.debug(f"No se pudo capturar screenshot de error: {type(shot_error).__name__}: {shot_error}")
             return None
+        except Exception:
+            # Errores inesperados (bugs, KeyError, ...) se propagan, sin dejar el modal abierto
+            await self.force_close_all_modals(page)
+            raise
     
-    async def wait_for_dynamic_iframe(self, max_wait_time: int = 15) -> Optional:
-        """Esperar a que aparezca dinámicamente el iframe"""
+    @contextlib.asynccontextmanager
+    async def _download_listener(self, page: Page, waiter: Optional[asyncio.Future] = None, timeout: int = 30000):
+        """
+        Listener 'download' de page como tarea (timeout en ms, 0 = sin límite). Si se
+        recibe 'waiter' (el compartido de download_csv) se reutiliza tal cual y no se
+        cierra al salir.
+        """
+        if waiter is not None:
+            yield waiter
+            return
+        waiter = asyncio.ensure_future(page.wait_for_event("download", timeout=timeout))
+        try:
+            yield waiter
+        finally:
+            # Ninguna espera queda viva al salir: se cancela y se espera su cierre
+            if not waiter.done():
+                waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)  # también la marca como consumida
+    
+    async def _await_download(self, waiter: asyncio.Future, timeout: float) -> Optional[Download]:
+        """Esperar al listener hasta 'timeout' segundos sin cancelarlo; la descarga o None"""
+        if not waiter.done():
+            await asyncio.wait({waiter}, timeout=timeout)
+        if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+            return waiter.result()
+        return None
+    
+    async def wait_for_dynamic_iframe(self, max_wait_time: int = 15, page: Optional[Page] = None) -> Optional:
+        """
+        Esperar a que aparezca dinámicamente el iframe de exportación.
+        Se revisan los frames ya presentes y, si no está, se espera el evento
+        frameattached/framenavigated (sin sondeo); un wait_for_selector sobre
+        el selector compuesto queda como respaldo corto si ningún frame calza.
+        """
+        page = page or self.page
         logger.info("Esperando que se cargue el iframe dinámicamente...")
         
-        start_time = asyncio.get_event_loop().time()
+        found: asyncio.Future = asyncio.get_running_loop().create_future()
         
-        while (asyncio.get_event_loop().time() - start_time) < max_wait_time:
-            try:
-                # Buscar iframes que puedan haber aparecido
-                iframe_selectors = [
-                    "iframe[id='DialogFrame']",
-                    "iframe[src*='modalexports']",
-                    "iframe[src*='export']",
-                    "#DialogFrame",
-                    "iframe"
-                ]
-                
-                for selector in iframe_selectors:
-                    try:
-                        iframes = await self.page.locator(selector).all()
-                        logger.info(f"Buscando iframes con '{selector}': {len(iframes)} encontrados")
-                        
-                        for i, iframe in enumerate(iframes):
-                            try:
-                                # Verificar si el iframe está cargado y tiene contenido
-                                frame_content = await iframe.content_frame()
-                                if frame_content:
-                                    # Esperar un poco más para que se cargue el contenido
-                                    await asyncio.sleep(1)
-                                    
-                                    # Verificar si contiene elementos de descarga
-                                    download_elements = await frame_content.locator("input, button").count()
-                                    logger.info(f"Iframe {i}: {download_elements} elementos interactivos encontrados")
-                                    
-                                    if download_elements > 0:
-                                        logger.info(f"Iframe válido encontrado: {selector}[{i}]")
-                                        return frame_content
-                                        
-                            except Exception as e:
-                                logger.debug(f"Error verificando iframe {i}: {e}")
-                                continue
-                                
-                    except Exception as e:
-                        logger.debug(f"Error con selector {selector}: {e}")
-                        continue
-                
-                # Si no encontró iframe, esperar un poco más
-                await asyncio.sleep(0.5)
-                
-            except Exception as e:
-                logger.debug(f"Error en ciclo de espera: {e}")
-                await asyncio.sleep(0.5)
+        def on_frame(frame):
+            if not found.done() and _is_export_frame(frame):
+                found.set_result(frame)
+        
+        page.on("frameattached", on_frame)
+        page.on("framenavigated", on_frame)
+        try:
+            frame = next((f for f in page.frames if _is_export_frame(f)), None)
+            if frame is None:
+                try:
+                    frame = await asyncio.wait_for(found, timeout=max_wait_time)
+                except asyncio.TimeoutError:
+                    frame = None
+            
+            if frame is not None:
+                try:
+                    await frame.wait_for_load_state("domcontentloaded")
+                    await frame.wait_for_selector("input, button", timeout=2000)
+                    logger.info(f"Iframe válido encontrado por evento: name='{frame.name}', url='{frame.url}'")
+                    return frame
+                except Exception as e:
+                    logger.debug(f"Iframe por evento sin controles: {e}")
+        finally:
+            page.remove_listener("frameattached", on_frame)
+            page.remove_listener("framenavigated", on_frame)
+        
+        # Respaldo: selector compuesto (frames reutilizados o sin nombre/url reconocible)
+        return await self._wait_iframe_by_selector(page, timeout=2000)
+    
+    async def _wait_iframe_by_selector(self, page: Page, timeout: int) -> Optional:
+        """
+        Esperar en el navegador (wait_for_function, sondeo cada WAIT_FUNCTION_POLLING ms)
+        al iframe de exportación: el que calza IFRAME_COMPOSITE_SELECTOR o, si no hay,
+        cualquier iframe del mismo origen que ya tenga controles de descarga.
+        """
+        try:
+            handle = await page.wait_for_function(
+                FIND_EXPORT_IFRAME_JS, arg=IFRAME_COMPOSITE_SELECTOR,
+                polling=WAIT_FUNCTION_POLLING, timeout=timeout
+            )
+            element = handle.as_element()
+            frame = await element.content_frame() if element else None
+            if frame:
+                await frame.wait_for_selector("input, button", timeout=3000)
+                logger.info(f"Iframe válido encontrado por selector: name='{frame.name}', url='{frame.url}'")
+                return frame
+        except Exception as e:
+            logger.debug(f"Iframe por selector no disponible: {e}")
         
         logger.warning("No se encontró iframe dinámico después de esperar")
         return None
     
-    async def handle_iframe_download(self, iframe_content, dataset_name: str) -> Optional[str]:
-        """Manejar la descarga desde el iframe"""
+    async def _probe_selectors(self, root, selectors: Sequence[str]) -> List[Tuple[str, Locator, List[bool]]]:
+        """
+        Consultar todos los selectores a la vez sobre root (página o frame): un solo
+        evaluate para los CSS estándar y uno por selector de sintaxis Playwright, sin
+        un Locator ni consultas is_visible/is_enabled por elemento.
+        Devuelve [(selector, locator, clickeable por índice)] en el orden de 'selectors'.
+        """
+        # Los CSS estándar van todos juntos en un evaluate; los de sintaxis Playwright,
+        # un evaluate_all cada uno (en paralelo con el anterior)
+        css = [selector for selector in selectors if _is_plain_css(selector)]
+        other = [selector for selector in selectors if not _is_plain_css(selector)]
+        
+        async def _css_flags():
+            return dict(zip(css, await root.evaluate(CSS_CLICKABLE_JS, css))) if css else {}
+        
+        async def _flags(selector):
+            states = await root.locator(selector).evaluate_all(ELEMENT_STATES_JS)
+            return [st["visible"] and st["enabled"] for st in states]
+        
+        found = await asyncio.gather(_css_flags(), *(_flags(sel) for sel in other), return_exceptions=True)
+        css_found, other_found = found[0], dict(zip(other, found[1:]))
+        if isinstance(css_found, Exception):
+            logger.debug(f"Error con selectores CSS {css}: {css_found}")
+            css_found = {}
+        
+        probes = []
+        for selector in selectors:
+            flags = css_found.get(selector) if selector in css_found else other_found.get(selector)
+            if flags is None or isinstance(flags, Exception):
+                logger.debug("Error con selector {}: {}", selector, flags)
+                continue
+            probes.append((selector, root.locator(selector), flags))
+        return probes
+    
+    async def handle_iframe_download(
+        self, iframe_content, dataset_name: str, page: Optional[Page] = None,
+        download_waiter: Optional[asyncio.Future] = None
+    ) -> Optional[str]:
+        """Manejar la descarga desde el iframe (download_waiter: listener compartido de download_csv)"""
+        page = page or self.page
         logger.info("Manejando descarga desde iframe...")
         
         try:
             # Debug del contenido del iframe
-            await self.debug_iframe_content(iframe_content)
-            
-            # Estrategias específicas para el iframe
-            download_selectors = [
-                "input[value*='Descargar']",
-                "input[value*='Download']", 
-                "button:has-text('Descargar')",
-                "button:has-text('Download')",
-                "input[type='button']",
-                "input[type='submit']",
-                "button[type='submit']",
-                "button",
-                "*[onclick*='download']",
-                "*[onclick*='export']"
-            ]
+            if self._verbose:
+                await self.debug_iframe_content(iframe_content)
             
             # Configurar listener de descarga
-            async with self.page.expect_download(timeout=30000) as download_info:
-                download_triggered = False
+            async with self._download_listener(page, download_waiter, timeout=30000) as waiter:
+                download_triggered: Optional[str] = None  # selector que disparó la descarga
                 
-                for selector in download_selectors:
-                    try:
-                        elements = await iframe_content.locator(selector).all()
-                        logger.info(f"Iframe selector '{selector}': {len(elements)} elementos")
-                        
-                        for i, element in enumerate(elements):
-                            try:
-                                is_visible = await element.is_visible()
-                                is_enabled = await element.is_enabled()
-                                
-                                if is_visible and is_enabled:
-                                    logger.info(f"Haciendo click en iframe elemento: {selector}[{i}]")
-                                    await element.click()
-                                    download_triggered = True
-                                    break
-                                    
-                            except Exception as e:
-                                logger.debug(f"Error con elemento {i}: {e}")
-                                continue
-                        
-                        if download_triggered:
-                            break
-                            
-                    except Exception as e:
-                        logger.debug(f"Error con selector iframe {selector}: {e}")
-                        continue
+                # Todas las consultas de selectores salen juntas (latencia = la más lenta)
+                candidates = self._winner_first("iframe_download_btn", IFRAME_DOWNLOAD_SELECTORS)
+                probes = await self._probe_selectors(iframe_content, candidates)
                 
-                if download_triggered:
-                    download = await download_info.value
-                    return await self.save_download(download, dataset_name)
-                else:
-                    # Intentar con JavaScript en el iframe
-                    js_commands = [
-                        "document.querySelector('input[value*=\"Descargar\"]')?.click()",
-                        "document.querySelector('input[type=\"button\"]')?.click()",
-                        "document.querySelector('button')?.click()",
-                        "document.forms[0]?.submit()",
-                        "[...document.querySelectorAll('*')].find(el => el.onclick && el.onclick.toString().includes('download'))?.click()"
-                    ]
+                for selector, locator, clickable in probes:
+                    logger.info(f"Iframe selector '{selector}': {len(clickable)} elementos")
                     
-                    for js_cmd in js_commands:
+                    for i, ok in enumerate(clickable):
+                        if not ok:
+                            continue
                         try:
-                            logger.info(f"Ejecutando JavaScript en iframe: {js_cmd}")
-                            await iframe_content.evaluate(js_cmd)
-                            await asyncio.sleep(1)
-                            
-                            # Verificar si se inició descarga
-                            try:
-                                download = await download_info.value
-                                logger.info("Descarga iniciada con JavaScript!")
-                                return await self.save_download(download, dataset_name)
-                            except:
-                                continue
-                                
+                            logger.info(f"Haciendo click en iframe elemento: {selector}[{i}]")
+                            await locator.nth(i).click()
+                            download_triggered = selector
+                            break
                         except Exception as e:
-                            logger.debug(f"Error con JavaScript: {e}")
+                            logger.debug("Error con elemento {}: {}", i, e)
                             continue
+                    
+                    if download_triggered:
+                        break
+                
+                if download_triggered:
+                    download = await self._await_download(waiter, 30)
+                    if download:
+                        self._winning_selectors["iframe_download_btn"] = download_triggered
+                        return await self.save_download(download, dataset_name)
+                    logger.debug(f"Click en {download_triggered} sin descarga")
+                else:
+                    # Intentar con JavaScript en el iframe: un solo evaluate que prueba
+                    # los candidatos en orden y se detiene en el primero que actúa
+                    logger.info("Ejecutando fallback JavaScript en iframe")
+                    try:
+                        used = await _run_helper(iframe_content, "__ineIframeFallback")
+                    except Exception as e:
+                        logger.debug(f"Error con JavaScript: {e}")
+                        used = -1
+                    
+                    if used >= 0:
+                        logger.info(f"Fallback JavaScript {used + 1} ejecutado, esperando descarga...")
+                        download = await self._await_download(waiter, 30)
+                        if download:
+                            logger.info("Descarga iniciada con JavaScript!")
+                            return await self.save_download(download, dataset_name)
                 
         except Exception as e:
             logger.error(f"Error manejando iframe: {e}")
         
         return None
     
-    async def try_direct_download_strategies(self, dataset_name: str) -> Optional[str]:
-        """Intentar descarga directa sin iframe"""
+    async def try_direct_download_strategies(
+        self, dataset_name: str, page: Optional[Page] = None,
+        download_waiter: Optional[asyncio.Future] = None
+    ) -> Optional[str]:
+        """Intentar descarga directa sin iframe (download_waiter: listener compartido de download_csv)"""
+        page = page or self.page
         logger.info("Intentando estrategias de descarga directa...")
         
         try:
             # Buscar botones de descarga en la página principal
-            download_selectors = [
-                "input[value*='Descargar']",
-                "button:has-text('Descargar')",
-                "text=Descargar",
-                "*[onclick*='download']",
-                "*[onclick*='export']",
-                ".download-button",
-                "#download",
-                "#export"
-            ]
-            
-            for selector in download_selectors:
-                try:
-                    elements = await self.page.locator(selector).all()
-                    if len(elements) > 0:
-                        logger.info(f"Encontrados {len(elements)} elementos con selector: {selector}")
+            candidates = self._winner_first("direct_download_btn", DIRECT_DOWNLOAD_SELECTORS)
+            probes = await self._probe_selectors(page, candidates)
+            
+            # Un único listener de descarga para todos los clicks: cada click tiene una
+            # ventana corta y luego se prueba el siguiente, sin un timeout de 15 s por intento
+            async with self._download_listener(page, download_waiter, timeout=30000) as waiter:
+                clicked = False
+                for selector, locator, clickable in probes:
+                    if len(clickable) > 0:
+                        logger.info(f"Encontrados {len(clickable)} elementos con selector: {selector}")
                         
-                        for i, element in enumerate(elements):
+                        for i, ok in enumerate(clickable):
+                            if not ok:
+                                continue
                             try:
-                                if await element.is_visible() and await element.is_enabled():
-                                    logger.info(f"Intentando descarga directa con: {selector}[{i}]")
-                                    
-                                    async with self.page.expect_download(timeout=15000) as download_info:
-                                        await element.click()
-                                        download = await download_info.value
-                                        return await self.save_download(download, dataset_name)
-                                        
+                                logger.info(f"Intentando descarga directa con: {selector}[{i}]")
+                                await locator.nth(i).click(no_wait_after=True, timeout=2000)
+                                clicked = True
                             except Exception as e:
-                                logger.debug(f"Error con elemento directo {i}: {e}")
+                                logger.debug("Error con elemento directo {}: {}", i, e)
                                 continue
-                                
-                except Exception as e:
-                    logger.debug(f"Error con selector directo {selector}: {e}")
-                    continue
+                            
+                            download = await self._await_download(waiter, 2)
+                            if download:
+                                self._winning_selectors["direct_download_btn"] = selector
+                                return await self.save_download(download, dataset_name)
+                
+                # Ningún click disparó la descarga a tiempo: esperar lo que quede del listener
+                if clicked:
+                    download = await self._await_download(waiter, 30)
+                    if download:
+                        return await self.save_download(download, dataset_name)
+                    logger.debug("Ningún click directo produjo una descarga")
                     
         except Exception as e:
             logger.error(f"Error en descarga directa: {e}")
         
         return None
     
-    async def try_javascript_download_strategies(self, dataset_name: str) -> Optional[str]:
-        """Intentar descarga usando JavaScript - Buscar botón Descargar en modal dialog"""
+    async def try_javascript_download_strategies(
+        self, dataset_name: str, page: Optional[Page] = None,
+        download_waiter: Optional[asyncio.Future] = None
+    ) -> Optional[str]:
+        """
+        Intentar descarga usando JavaScript - Buscar botón Descargar en modal dialog
+        (download_waiter: listener compartido de download_csv)
+        """
+        page = page or self.page
         logger.info("Intentando encontrar botón Descargar en modal dialog...")
         
         try:
             # Basado en las screenshots, el botón Descargar está en un modal dialog, no iframe
-            # Estrategias específicas para encontrar el botón "Descargar"
-            
-            download_selectors = [
-                # Botones específicos dentro del dialog-content dinámico (lo más específico primero)
-                "#dialog-content input[value='Descargar']",
-                "#dialog-content button:has-text('Descargar')",
-                "#dialog-content input[value*='Descargar']",
-                "#dialog-content input[type='button']",
-                "#dialog-content button[type='button']",
-                "#dialog-content input[type='submit']",
-                "#dialog-content button",
-                
-                # Botones dentro de modales jQuery UI
-                ".ui-dialog input[value*='Descargar']",
-                ".ui-dialog button:has-text('Descargar')",
-                ".ui-dialog input[type='button']",
-                ".ui-dialog button[type='button']",
-                
-                # Botones generales con texto "Descargar"
-                "input[value='Descargar']",
-                "button:has-text('Descargar')",
-                "input[value*='Descargar']",
-                
-                # Fallback - cualquier botón visible
-                "input[type='button']:visible",
-                "button:visible"
+            # Estrategias específicas para encontrar el botón "Descargar": CSS acotado al
+            # modal (MODAL_DOWNLOAD_SELECTORS) y al final un único fallback por rol
+            candidates = [
+                (selector, self._loc(page, selector))
+                for selector in self._winner_first("modal_download_btn", MODAL_DOWNLOAD_SELECTORS)
             ]
-            
-            for i, selector in enumerate(download_selectors):
-                try:
-                    logger.info(f"Probando selector {i+1}/{len(download_selectors)}: {selector}")
-                    
-                    # Buscar elementos con este selector
-                    elements = await self.page.locator(selector).all()
-                    logger.info(f"Encontrados {len(elements)} elementos con selector: {selector}")
-                    
-                    for j, element in enumerate(elements):
-                        try:
-                            # Verificar si el elemento es visible y habilitado
-                            if await element.is_visible() and await element.is_enabled():
-                                text_content = await element.text_content() or ""
-                                input_value = await element.get_attribute("value") or ""
-                                logger.info(f"Elemento {j+1}: text='{text_content}', value='{input_value}', visible=True, enabled=True")
-                                
-                                # Intentar hacer click y descargar
-                                async with self.page.expect_download(timeout=10000) as download_info:
-                                    await element.click()
+            candidates.append(
+                (MODAL_DOWNLOAD_ROLE_LABEL, page.get_by_role("button", name=MODAL_DOWNLOAD_ROLE_NAME))
+            )
+            async with self._download_listener(page, download_waiter, timeout=30000) as waiter:
+                for i, (selector, locator) in enumerate(candidates):
+                    try:
+                        logger.info(f"Probando selector {i+1}/{len(candidates)}: {selector}")
+                        
+                        # Estado de todos los elementos con este selector en un solo RPC
+                        states = await locator.evaluate_all(ELEMENT_STATES_JS)
+                        logger.info(f"Encontrados {len(states)} elementos con selector: {selector}")
+                        
+                        for j, state in enumerate(states):
+                            try:
+                                # Verificar si el elemento es visible y habilitado
+                                if state["visible"] and state["enabled"]:
+                                    logger.info(f"Elemento {j+1}: text='{state['text']}', value='{state['value']}', visible=True, enabled=True")
+                                    
+                                    # Click y ventana de 10 s sobre el listener compartido
+                                    await locator.nth(j).click()
                                     logger.info(f"Haciendo click en elemento: {selector}[{j}]")
-                                    await asyncio.sleep(2)
                                     
-                                    download = await download_info.value
-                                    logger.info(f"¡Descarga exitosa con selector {selector}!")
-                                    return await self.save_download(download, dataset_name)
-                            else:
-                                text_content = await element.text_content() or ""
-                                input_value = await element.get_attribute("value") or ""
-                                is_visible = await element.is_visible()
-                                is_enabled = await element.is_enabled()
-                                logger.debug(f"Elemento {j+1} no clickeable: text='{text_content}', value='{input_value}', visible={is_visible}, enabled={is_enabled}")
+                                    download = await self._await_download(waiter, 10)
+                                    if download:
+                                        logger.info(f"¡Descarga exitosa con selector {selector}!")
+                                        self._winning_selectors["modal_download_btn"] = selector
+                                        return await self.save_download(download, dataset_name)
+                                    logger.debug("Click en {}[{}] sin descarga", selector, j)
+                                else:
+                                    logger.debug(
+                                        "Elemento {} no clickeable: text='{}', value='{}', visible={}, enabled={}",
+                                        j + 1, state["text"], state["value"], state["visible"], state["enabled"]
+                                    )
+                                    
+                            except Exception as e:
+                                logger.debug("Error con elemento {} del selector {}: {}", j + 1, selector, e)
+                                continue
                                 
-                        except Exception as e:
-                            logger.debug(f"Error con elemento {j+1} del selector {selector}: {e}")
-                            continue
-                            
-                except Exception as e:
-                    logger.debug(f"Error con selector {selector}: {e}")
-                    continue
-            
-            # ESTRATEGIA ESPECÍFICA: Sabemos que hay un iframe DialogFrame en #dialog-content
-            logger.info("Intentando acceso directo al iframe DialogFrame...")
-            js_iframe_commands = [
-                # Acceder al iframe DialogFrame específicamente
-                """
-                try {
-                    const iframe = document.querySelector('#dialog-content iframe[id="DialogFrame"]') || document.querySelector('iframe[id="DialogFrame"]');
-                    if (iframe && iframe.contentDocument) {
-                        const doc = iframe.contentDocument;
-                        const btn = doc.querySelector('input[value*="Descargar"]') || doc.querySelector('input[type="button"]') || doc.querySelector('button');
-                        if (btn) { btn.click(); console.log('Clicked iframe button:', btn.value || btn.textContent); }
-                    }
-                } catch(e) { console.log('Error accessing iframe:', e); }
-                """,
+                    except Exception as e:
+                        logger.debug(f"Error con selector {selector}: {e}")
+                        continue
                 
-                # Intentar con contentWindow
-                """
-                try {
-                    const iframe = document.querySelector('#dialog-content iframe[id="DialogFrame"]') || document.querySelector('iframe[id="DialogFrame"]');
-                    if (iframe && iframe.contentWindow) {
-                        const doc = iframe.contentWindow.document;
-                        const btn = doc.querySelector('input[value*="Descargar"]') || doc.querySelector('input[type="button"]') || doc.querySelector('button');
-                        if (btn) { btn.click(); console.log('Clicked iframe button via contentWindow:', btn.value || btn.textContent); }
-                    }
-                } catch(e) { console.log('Error accessing iframe via contentWindow:', e); }
-                """
-            ]
-            
-            for i, js_cmd in enumerate(js_iframe_commands):
+                # ESTRATEGIA ESPECÍFICA: iframe DialogFrame en #dialog-content y, como último
+                # recurso, botones Descargar del documento; todo en un único evaluate
+                logger.info("Intentando JavaScript (iframe DialogFrame y botones directos)...")
                 try:
-                    logger.info(f"Ejecutando comando iframe JavaScript {i+1}/2")
-                    
-                    async with self.page.expect_download(timeout=10000) as download_info:
-                        await self.page.evaluate(js_cmd)
-                        await asyncio.sleep(3)
-                        
-                        download = await download_info.value
-                        logger.info(f"¡Descarga exitosa con comando iframe JavaScript {i+1}!")
-                        return await self.save_download(download, dataset_name)
-                        
+                    used = await _run_helper(page, "__ineModalFallback")
+                    if used >= 0:
+                        logger.info(f"Comando JavaScript {used + 1} ejecutado, esperando descarga...")
+                        download = await self._await_download(waiter, 15)
+                        if download:
+                            logger.info(f"¡Descarga exitosa con comando JavaScript {used + 1}!")
+                            return await self.save_download(download, dataset_name)
+                    else:
+                        logger.debug("Ningún comando JavaScript encontró un botón")
                 except Exception as e:
-                    logger.debug(f"Error comando iframe JavaScript {i+1}: {e}")
-                    continue
-            
-            # Si no funcionaron los comandos específicos del iframe, intentar JavaScript directo
-            logger.info("Intentando JavaScript directo como último recurso...")
-            js_commands = [
-                "document.querySelector('input[value=\"Descargar\"]')?.click()",
-                "document.querySelector('button').click()", 
-                "[...document.querySelectorAll('input')].find(el => el.value && el.value.includes('Descargar'))?.click()",
-                "[...document.querySelectorAll('button')].find(el => el.textContent && el.textContent.includes('Descargar'))?.click()"
-            ]
-            
-            for i, js_cmd in enumerate(js_commands):
-                try:
-                    logger.info(f"Ejecutando JavaScript directo {i+1}/4: {js_cmd}")
-                    
-                    async with self.page.expect_download(timeout=8000) as download_info:
-                        await self.page.evaluate(js_cmd)
-                        await asyncio.sleep(2)
-                        
-                        download = await download_info.value
-                        logger.info(f"¡Descarga exitosa con JavaScript directo {i+1}!")
-                        return await self.save_download(download, dataset_name)
-                        
-                except Exception as e:
-                    logger.debug(f"Error JavaScript directo {i+1}: {e}")
-                    continue
+                    logger.debug(f"Error con comandos JavaScript: {e}")
                     
         except Exception as e:
             logger.error(f"Error en estrategias JavaScript: {e}")
@@ -781,118 +1464,274 @@ class INEScraper:
         logger.warning("No se pudo encontrar o hacer click en el botón Descargar")
         return None
     
-    async def force_close_all_modals(self):
+    async def force_close_all_modals(self, page: Optional[Page] = None):
         """Forzar el cierre de todos los modales abiertos (versión optimizada)"""
+        page = page or self.page
         logger.info("Cerrando modales...")
         
         try:
-            # Estrategia 1: Presionar Escape (más rápido)
-            await self.page.keyboard.press("Escape")
-            await asyncio.sleep(0.5)
-            
-            # Estrategia 2: Remover overlays problemáticos con JavaScript
-            await self.page.evaluate("""
-                // Remover overlays que bloquean clicks
-                document.querySelectorAll('.ui-widget-overlay').forEach(el => el.remove());
-                document.querySelectorAll('.modal-backdrop').forEach(el => el.remove());
-                
-                // Cerrar diálogos jQuery UI
-                if (typeof $ !== 'undefined') {
-                    $('.ui-dialog').dialog('close');
-                }
-                
-                // Remover cualquier elemento con position fixed que pueda ser overlay
-                document.querySelectorAll('[class*="overlay"]').forEach(el => {
-                    if (el.style.position === 'fixed' || el.style.position === 'absolute') {
-                        el.style.display = 'none';
-                    }
-                });
-            """)
-            
-            # Estrategia 3: Buscar botones de cierre solo si es necesario
-            close_selectors = [
-                ".ui-dialog-titlebar-close",
-                ".ui-icon-closethick", 
-                "[title='close']"
-            ]
+            # Todo el cierre en un único evaluate; retorna True si queda un diálogo visible
+            still_open = await _run_helper(page, "__ineCloseModals")
             
-            for selector in close_selectors:
+            if still_open:
+                # Fallback desde Python solo si el diálogo sigue abierto
+                await page.keyboard.press("Escape")
                 try:
-                    elements = await self.page.locator(selector).all()
-                    if len(elements) > 0:
-                        for element in elements:
-                            if await element.is_visible():
-                                await element.click()
-                                break
-                        break  # Si encontró y clickeó uno, salir del loop
-                except:
-                    continue
+                    await self._loc(page, ".ui-dialog:visible").first.wait_for(state="hidden", timeout=2000)
+                except Exception as e:
+                    logger.debug(f"Diálogo aún visible tras Escape: {e}")
             
-            await asyncio.sleep(1)
             logger.info("Modales cerrados")
             
         except Exception as e:
             logger.debug(f"Error cerrando modales: {e}")
             # Si falla, al menos intentar Escape de nuevo
             try:
-                await self.page.keyboard.press("Escape")
-            except:
-                pass
+                await page.keyboard.press("Escape")
+            except PlaywrightError as e:
+                logger.debug(f"Escape falló: {e}")
     
     async def debug_iframe_content(self, iframe_content):
-        """Debug detallado del contenido del iframe"""
-        logger.info("=== DEBUG: Contenido del iframe ===")
+        """Debug detallado del contenido del iframe (solo en modo verbose)"""
+        if not self._verbose:
+            return
+        logger.debug("=== DEBUG: Contenido del iframe ===")
         
         try:
-            # Buscar todos los elementos
-            all_inputs = await iframe_content.locator("input").all()
-            logger.info(f"Inputs en iframe: {len(all_inputs)}")
-            
-            for i, input_elem in enumerate(all_inputs):
-                try:
-                    input_type = await input_elem.get_attribute("type")
-                    input_value = await input_elem.get_attribute("value") 
-                    is_visible = await input_elem.is_visible()
-                    is_enabled = await input_elem.is_enabled()
-                    logger.info(f"  Input {i}: type='{input_type}', value='{input_value}', visible={is_visible}, enabled={is_enabled}")
-                except Exception as e:
-                    logger.debug(f"Error con input {i}: {e}")
-            
-            all_buttons = await iframe_content.locator("button").all()
-            logger.info(f"Buttons en iframe: {len(all_buttons)}")
-            
-            for i, button_elem in enumerate(all_buttons):
-                try:
-                    button_text = await button_elem.text_content()
-                    is_visible = await button_elem.is_visible()
-                    is_enabled = await button_elem.is_enabled()
-                    logger.info(f"  Button {i}: text='{button_text}', visible={is_visible}, enabled={is_enabled}")
-                except Exception as e:
-                    logger.debug(f"Error con button {i}: {e}")
+            # Buscar todos los elementos (inputs y botones en un único evaluate_all)
+            states = await iframe_content.locator("input, button").evaluate_all(ELEMENT_STATES_JS)
+            inputs = [st for st in states if st["tag"] == "input"]
+            buttons = [st for st in states if st["tag"] == "button"]
+            
+            # Un solo mensaje multilínea en vez de una línea de log por control
+            lines = [f"Inputs en iframe: {len(inputs)}"]
+            lines.extend(
+                f"  Input {i}: type='{state['type']}', value='{state['value']}', visible={state['visible']}, enabled={state['enabled']}"
+                for i, state in enumerate(inputs)
+            )
+            lines.append(f"Buttons en iframe: {len(buttons)}")
+            lines.extend(
+                f"  Button {i}: text='{state['text']}', visible={state['visible']}, enabled={state['enabled']}"
+                for i, state in enumerate(buttons)
+            )
+            logger.debug("\n".join(lines))
                     
         except Exception as e:
             logger.error(f"Error debuggeando iframe: {e}")
     
     async def save_download(self, download, dataset_name: str) -> str:
-        """Guardar el archivo descargado"""
-        safe_name = dataset_name.replace(" ", "_").replace("(", "").replace(")", "").replace(",", "")
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{safe_name}_{timestamp}.csv"
+        """
+        Encolar el guardado del archivo descargado y retornar su ruta de inmediato;
+        el archivo queda escrito tras flush_saves() (scrape_all_modules / close_browser).
+        """
+        if self._reuse_exports:
+            self._record_export_request(dataset_name, download.url)
+        
+        file_path = self._next_file_path(dataset_name)
+        if self._saver_task is None:
+            self._save_queue = asyncio.Queue()
+            self._saver_task = asyncio.create_task(self._saver_loop())
+        self._save_queue.put_nowait((download, file_path, dataset_name))
+        return str(file_path)
+    
+    def _next_file_path(self, dataset_name: str) -> Path:
+        """Ruta del próximo CSV del dataset en esta corrida"""
+        # {stem}_{timestamp de la corrida}.csv; si el stem se repite, sufijo _vN
+        # (formato que --standardize ya reconoce). El timestamp se formatea una vez
+        # por corrida (_batch_ts), no por archivo, y _vN ya evita colisiones entre
+        # guardados concurrentes; no se usa un contador _NNNN: el _TS_RE de
+        # standardize espera que el nombre termine en el timestamp o en _vN
+        stem = f"{_download_stem(dataset_name)}_{self._batch_ts}"
+        n = self._batch_stems.get(stem, 0) + 1
+        self._batch_stems[stem] = n
+        filename = f"{stem}.csv" if n == 1 else f"{stem}_v{n}.csv"
+        self._ensure_downloads_dir()
+        return self.downloads_dir / filename
+    
+    def _ensure_downloads_dir(self):
+        """Crear la carpeta de descargas de la corrida (una sola vez)"""
+        if not self._downloads_dir_ready:
+            self.downloads_dir.mkdir(parents=True, exist_ok=True)
+            self._downloads_dir_ready = True
+    
+    def _remember_request(self, request):
+        """Listener 'request' del contexto: guardar las últimas peticiones que pueden ser una exportación"""
+        if request.resource_type not in EXPORT_REQUEST_TYPES:
+            return
+        recent = self._recent_requests
+        recent.pop(request.url, None)
+        recent[request.url] = (request.method, request.post_data, request.headers.get("content-type"))
+        if len(recent) > MAX_RECENT_REQUESTS:
+            del recent[next(iter(recent))]
+    
+    def _record_export_request(self, dataset_name: str, url: str):
+        """Asociar al dataset la petición que originó su descarga"""
+        if not url.startswith(("http://", "https://")):
+            return  # blob:/data: generados en la página, no se pueden repetir
+        method, post_data, content_type = self._recent_requests.get(url, ("GET", None, None))
+        entry = {"url": url, "method": method, "post_data": post_data, "content_type": content_type}
+        if self._export_requests.get(dataset_name) != entry:
+            self._export_requests[dataset_name] = entry
+            self._export_requests_dirty = True
+            logger.debug(f"Petición de exportación capturada para {dataset_name}: {method} {url}")
+    
+    async def _fetch_cached_export(self, dataset_name: str, page: Page) -> Optional[str]:
+        """
+        Repetir la petición de exportación guardada con page.request (cookies del
+        contexto). Si la respuesta no es un CSV (error, HTML de sesión vencida) se
+        descarta la entrada y se vuelve al flujo con modal.
+        """
+        entry = self._export_requests[dataset_name]
+        headers = {"content-type": entry["content_type"]} if entry.get("content_type") else {}
+        # GET condicional: si hay ETag del último CSV (y sigue en disco) el servidor puede
+        # responder 304 y se reutiliza ese archivo (no con --refresh)
+        previous = self._download_cache.get(dataset_name) or {}
+        if self._cache_ttl > 0 and previous.get("etag") and os.path.isfile(previous.get("path", "")):
+            headers["if-none-match"] = previous["etag"]
+        try:
+            response = await page.request.fetch(
+                entry["url"], method=entry.get("method", "GET"),
+                data=entry.get("post_data"), headers=headers or None,
+                timeout=self.scraper_config["download_timeout"]
+            )
+            if response.status == 304 and "if-none-match" in headers:
+                logger.info(f"CSV sin cambios en el servidor (304), se reutiliza: {previous['path']}")
+                return await self._adopt_cached(dataset_name, previous["path"], revalidated=True)
+            body = await response.body()
+        except PlaywrightError as e:
+            logger.debug(f"Petición directa falló para {dataset_name}: {e}")
+            body = None
+            response = None
         
-        file_path = self.downloads_dir / filename
-        await download.save_as(file_path)
+        if response is None or not response.ok or not body or body.lstrip()[:1] == b"<":
+            logger.info(f"Petición de exportación guardada no válida para {dataset_name}, usando el modal")
+            del self._export_requests[dataset_name]
+            self._export_requests_dirty = True
+            return None
         
-        logger.info(f"CSV descargado exitosamente: {file_path}")
+        file_path = self._next_file_path(dataset_name)
+        await asyncio.to_thread(file_path.write_bytes, body)
+        self._record_download(dataset_name, file_path, response.headers.get("etag"))
+        logger.info(f"CSV descargado directamente (sin modal): {file_path}")
         return str(file_path)
     
-    async def scrape_module(self, module_key: str) -> List[str]:
-        """Hacer scraping de un módulo completo"""
-        module_info = MODULES_TO_SCRAPE[module_key]
-        module_name = module_info["name"]
-        configured_datasets = module_info["datasets"]
+    def _cached_download(self, dataset_name: str) -> Optional[str]:
+        """CSV ya descargado del dataset si es más reciente que el TTL y sigue en disco"""
+        if self._cache_ttl <= 0:
+            return None
+        entry = self._download_cache.get(dataset_name)
+        if entry and time.time() - entry.get("downloaded_at", 0) <= self._cache_ttl:
+            path = entry.get("path")
+            if path and os.path.isfile(path):
+                return path
+        # Sin entrada en download_cache.json (corrida interrumpida antes de persistir,
+        # archivo borrado): buscar el CSV en las carpetas de corridas anteriores
+        return self._disk_downloads().get(_download_stem(dataset_name))
+    
+    def _disk_downloads(self) -> Dict[str, str]:
+        """
+        Índice stem -> CSV más reciente (no vacío, dentro del TTL) de las corridas
+        anteriores en data/downloads; se arma una sola vez con os.scandir
+        """
+        if self._disk_index is not None:
+            return self._disk_index
+        
+        index: Dict[str, Tuple[float, str]] = {}
+        cutoff = time.time() - self._cache_ttl
+        try:
+            with os.scandir(self.downloads_dir.parent) as runs:
+                run_dirs = [d.path for d in runs if d.is_dir() and d.stat().st_mtime >= cutoff]
+            for run_dir in run_dirs:
+                with os.scandir(run_dir) as entries:
+                    for entry in entries:
+                        m = _DOWNLOAD_NAME_RE.match(entry.name)
+                        if not m or not entry.is_file():
+                            continue
+                        st = entry.stat()
+                        if st.st_size == 0 or st.st_mtime < cutoff:
+                            continue
+                        stem = m.group(1)
+                        if stem not in index or st.st_mtime > index[stem][0]:
+                            index[stem] = (st.st_mtime, entry.path)
+        except OSError as e:
+            logger.debug(f"No se pudieron indexar descargas anteriores: {e}")
+        
+        self._disk_index = {stem: path for stem, (_, path) in index.items()}
+        return self._disk_index
+    
+    def _record_download(
+        self, dataset_name: str, file_path, etag: Optional[str] = None,
+        downloaded_at: Optional[float] = None
+    ):
+        """Registrar el CSV recién obtenido del dataset en el caché de descargas"""
+        self._download_cache[dataset_name] = {
+            "path": str(file_path), "etag": etag,
+            "downloaded_at": downloaded_at if downloaded_at is not None else time.time()
+        }
+        self._download_cache_dirty = True
+        self._log_progress(dataset_name, file_path)
+    
+    def _log_progress(self, dataset_name: str, file_path):
+        """Agregar al registro de la corrida: fecha ISO, módulo, dataset y ruta (TSV)"""
+        try:
+            if self._progress_log is None:
+                self._ensure_downloads_dir()
+                # buffering=1: cada línea llega al disco al escribirse (se puede seguir con tail -f)
+                self._progress_log = open(
+                    self.downloads_dir / DOWNLOAD_LOG_NAME, "a", encoding="utf-8", buffering=1
+                )
+            module = self._dataset_modules.get(dataset_name, "")
+            self._progress_log.write(
+                f"{datetime.now().isoformat(timespec='seconds')}\t{module}\t{dataset_name}\t{file_path}\n"
+            )
+        except OSError as e:
+            logger.debug(f"No se pudo escribir el registro de descargas: {e}")
+    
+    async def _saver_loop(self):
+        """Consumidor de _save_queue: escribe cada descarga en su ruta final"""
+        while True:
+            download, file_path, dataset_name = await self._save_queue.get()
+            try:
+                await self._write_download(download, file_path)
+                self._record_download(dataset_name, file_path)
+            except Exception as e:
+                logger.error(f"Error guardando {file_path}: {e}")
+                self._failed_saves.add(str(file_path))
+            finally:
+                self._save_queue.task_done()
+    
+    async def flush_saves(self, timeout: Optional[float] = None) -> bool:
+        """Esperar los guardados pendientes (como máximo 'timeout' segundos); True si terminaron"""
+        if self._save_queue is None:
+            return True
+        try:
+            await asyncio.wait_for(self._save_queue.join(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+    
+    async def _write_download(self, download, file_path: Path):
+        """Escribir una descarga en file_path (espera a que el navegador la complete)"""
+        try:
+            # path() espera a que el temporal de Playwright esté completo; moverlo fuera del event loop
+            src_path = await download.path()
+            await asyncio.to_thread(_move_download, str(src_path), file_path)
+        except Exception as e:
+            # Navegador remoto o sin archivo local: copia estándar de Playwright
+            logger.debug(f"Copia directa no disponible ({e}), usando save_as")
+            await download.save_as(file_path)
+        
+        logger.info(f"CSV descargado exitosamente: {file_path}")
+    
+    async def scrape_module(self, module_key: str, page: Optional[Page] = None) -> List[str]:
+        """Hacer scraping de un módulo completo (en 'page', por defecto la página principal)"""
+        page = page or self.page
+        module_name, configured_datasets = MODULES[module_key]
+        delay = self.scraper_config["delay_between_requests"]
         
         logger.info(f"Iniciando scraping del módulo: {module_name}")
         downloaded_files = []
+        self._dataset_modules.update(dict.fromkeys(configured_datasets, module_name))
         
         try:
             # Determinar qué datasets usar
@@ -901,37 +1740,53 @@ class INEScraper:
             # Si la configuración está vacía, descubrir datasets automáticamente
             if not configured_datasets:
                 logger.info(f"Configuración de datasets vacía para {module_name}, descubriendo automáticamente...")
-                datasets_to_process = await self.discover_available_datasets(module_name)
+                datasets_to_process = await self.discover_available_datasets(module_name, page)
                 
                 if not datasets_to_process:
                     logger.warning(f"No se encontraron datasets para el módulo: {module_name}")
                     return downloaded_files
                 
                 logger.info(f"Se descubrieron {len(datasets_to_process)} datasets automáticamente")
+                self._dataset_modules.update(dict.fromkeys(datasets_to_process, module_name))
+                datasets_to_process = await self._skip_cached(datasets_to_process, downloaded_files)
             else:
+                # Datasets con CSV reciente: se reportan sin pasar por el navegador (si
+                # están todos, ni siquiera se expande el módulo)
+                datasets_to_process = await self._skip_cached(datasets_to_process, downloaded_files)
+                if not datasets_to_process:
+                    logger.info(f"Módulo {module_name}: todos los datasets vigentes en caché")
+                    return downloaded_files
+                
                 # Expandir el módulo para datasets configurados
-                if not await self.expand_module_section(module_name):
+                if not await self.expand_module_section(module_name, page):
                     logger.error(f"No se pudo expandir el módulo: {module_name}")
                     return downloaded_files
             
-            # Procesar cada dataset
-            for dataset in datasets_to_process:
-                logger.info(f"Procesando dataset: {dataset}")
-                
-                try:
-                    # Seleccionar dataset
-                    if await self.select_dataset(dataset):
-                        # Descargar CSV
-                        file_path = await self.download_csv(dataset)
-                        if file_path:
-                            downloaded_files.append(file_path)
-                        
-                        # Delay entre descargas
-                        await asyncio.sleep(self.scraper_config["delay_between_requests"])
+            # Procesar datasets: en paralelo si hay más de una página configurada
+            n_pages = min(int(self.scraper_config.get("concurrent_pages", 1)), len(datasets_to_process))
+            if n_pages > 1:
+                downloaded_files += await self._scrape_datasets_parallel(
+                    module_name, datasets_to_process, n_pages, page
+                )
+            else:
+                for dataset in datasets_to_process:
+                    logger.info(f"Procesando dataset: {dataset}")
                     
-                except Exception as e:
-                    logger.error(f"Error procesando dataset {dataset}: {e}")
-                    continue
+                    try:
+                        # Seleccionar dataset
+                        if await self.select_dataset(dataset, page):
+                            # Descargar CSV
+                            file_path = await self.download_csv(dataset, page)
+                            if file_path:
+                                downloaded_files.append(file_path)
+                            
+                            # Delay entre descargas: como máximo delay_between_requests,
+                            # menos si la página ya quedó sin tráfico de red
+                            await self._settle(page, delay)
+                        
+                    except Exception as e:
+                        logger.error(f"Error procesando dataset {dataset}: {e}")
+                        continue
             
             logger.info(f"Módulo {module_name} completado. Archivos descargados: {len(downloaded_files)}")
             
@@ -940,78 +1795,325 @@ class INEScraper:
         
         return downloaded_files
     
+    async def _skip_cached(self, datasets: Sequence[str], cached_files: List[str]) -> List[str]:
+        """Datasets a descargar; los que tienen CSV vigente en caché se agregan a cached_files"""
+        pending = []
+        for dataset in datasets:
+            cached = self._cached_download(dataset)
+            if cached:
+                logger.info(f"Dataset {dataset} vigente en caché, no se descarga: {cached}")
+                cached_files.append(await self._adopt_cached(dataset, cached))
+            else:
+                pending.append(dataset)
+        return pending
+    
+    async def _adopt_cached(self, dataset_name: str, cached_path: str, revalidated: bool = False) -> str:
+        """
+        Traer a la carpeta de la corrida el CSV reutilizado de una corrida anterior
+        (hard link, o copia si no se puede), para que la carpeta quede completa y
+        --missingfiles / --standardize la vean igual que una descarga nueva.
+        La antigüedad del caché se conserva salvo que el servidor lo haya revalidado (304)
+        """
+        previous = self._download_cache.get(dataset_name) or {}
+        if previous.get("path") != cached_path:
+            # Hallado en disco (_disk_downloads): sin ETag, antigüedad por mtime
+            previous = {"downloaded_at": os.path.getmtime(cached_path)}
+        downloaded_at = None if revalidated else previous.get("downloaded_at")
+        file_path = Path(cached_path)
+        if file_path.parent != self.downloads_dir:
+            file_path = self._next_file_path(dataset_name)
+            await asyncio.to_thread(_link_file, cached_path, file_path)
+        self._record_download(dataset_name, file_path, previous.get("etag"), downloaded_at)
+        return str(file_path)
+    
+    async def _prepare_worker_page(self, page: Page, module_name: str) -> bool:
+        """Dejar una página del pool posicionada en el módulo (sitio cargado + árbol expandido)"""
+        try:
+            await self.navigate_to_site(page)
+            if await self.expand_module_section(module_name, page):
+                return True
+            logger.warning(f"Página extra sin módulo expandido, no se usa en: {module_name}")
+        except Exception as e:
+            logger.warning(f"No se pudo preparar página extra para {module_name}: {e}")
+        return False
+    
+    async def _wait_after_click(
+        self, page: Page, expect_selector: Optional[str] = None,
+        load_state: str = "domcontentloaded", max_wait: float = 5
+    ):
+        """
+        Esperar el efecto de un click (en vez de un sleep fijo): el estado de carga
+        'load_state' y, si se indica, que 'expect_selector' quede visible; con tope
+        max_wait segundos. Un selector que no aparece propaga el timeout.
+        """
+        try:
+            await page.wait_for_load_state(load_state, timeout=max_wait * 1000)
+        except PlaywrightError as e:
+            logger.debug(f"Estado {load_state} no alcanzado: {e}")
+        if expect_selector:
+            await page.wait_for_selector(expect_selector, state="visible", timeout=max_wait * 1000)
+    
+    async def _block_resources(self, context: BrowserContext, page: Page):
+        """
+        No descargar recursos que el scraping no usa (imágenes, fuentes, media) ni
+        analítica/publicidad de terceros (blocked_hosts); el CSS se deja pasar: la
+        visibilidad del árbol y los modales depende de él. Se bloquea por patrones de
+        URL en el propio Chromium (CDP Network.setBlockedURLs): sin un callback de
+        Python por petición y sin apagar la caché HTTP, como haría context.route("**/*")
+        """
+        extensions = [
+            ext for kind in self.scraper_config.get("blocked_resource_types", ())
+            for ext in BLOCKED_EXTENSIONS.get(kind, ())
+        ]
+        hosts = tuple(self.scraper_config.get("blocked_hosts", ()))
+        if not extensions and not hosts:
+            return
+        # Extensión al final de la URL o justo antes de la query (no '.ico' dentro de
+        # 'jquery.ui.icons.css'); host seguido de '/'
+        try:
+            cdp = await context.new_cdp_session(page)
+            await cdp.send("Network.enable")
+            await cdp.send("Network.setBlockedURLs", {"urls": [
+                *(pattern for ext in extensions for pattern in (f"*.{ext}", f"*.{ext}?*")),
+                *(f"*{host}/*" for host in hosts),
+            ]})
+        except PlaywrightError as e:
+            # Sin CDP (otro navegador): una ruta con la regex equivalente a esos mismos
+            # patrones (route usa search), el resto no pasa por Python
+            logger.debug(f"Bloqueo por CDP no disponible ({e}), usando rutas por patrón")
+            alternatives = []
+            if extensions:
+                alternatives.append(rf"\.(?:{'|'.join(map(re.escape, extensions))})(?:$|\?)")
+            alternatives += [re.escape(f"{host}/") for host in hosts]
+            await context.route(re.compile("|".join(alternatives)), lambda route: route.abort())
+    
+    def _track_network(self, page: Page):
+        """
+        Contar las peticiones en curso de page (el cambio de dataset es AJAX sobre el
+        mismo documento: wait_for_load_state("networkidle") ya no espera nada)
+        """
+        activity = self._net_activity[page] = [0, time.monotonic()]
+        
+        def started(_request):
+            activity[0] += 1
+            activity[1] = time.monotonic()
+        
+        def ended(_request):
+            activity[0] = max(0, activity[0] - 1)
+            activity[1] = time.monotonic()
+        
+        page.on("request", started)
+        page.on("requestfinished", ended)
+        page.on("requestfailed", ended)
+    
+    async def _settle(self, page: Page, max_wait: float):
+        """
+        Pausa entre datasets: al menos SETTLE_MIN_FRACTION de max_wait y luego hasta
+        que page lleve SETTLE_QUIET_S sin peticiones en curso, con tope max_wait segundos
+        """
+        deadline = time.monotonic() + max_wait
+        await asyncio.sleep(max_wait * SETTLE_MIN_FRACTION)
+        activity = self._net_activity.get(page)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if activity is not None and activity[0] == 0 and (
+                time.monotonic() - activity[1] >= SETTLE_QUIET_S
+            ):
+                return
+            # Página sin seguimiento de red: se cumple el tope completo
+            await asyncio.sleep(min(SETTLE_POLL_S, remaining) if activity is not None else remaining)
+    
+    async def _scrape_datasets_parallel(
+        self, module_name: str, datasets: List[str], n_pages: int, lead_page: Optional[Page] = None
+    ) -> List[str]:
+        """
+        Descargar datasets con un pool de páginas (cada una en su contexto).
+        Cada worker toma una página libre del pool, selecciona y descarga, y la devuelve;
+        así se solapan las esperas de modales y descargas entre datasets.
+        Las páginas extra se crean una vez y se reutilizan en los módulos siguientes.
+        """
+        logger.info(f"Descarga en paralelo de {len(datasets)} datasets con {n_pages} páginas")
+        
+        # La página guía ya tiene el módulo expandido; se suman n_pages-1 extra
+        lead_page = lead_page or self.page
+        workers = self._worker_pages.setdefault(lead_page, [])
+        # Tope global de contextos (cada uno es un proceso de renderizado de ~50 MB): con
+        # módulos en paralelo los pools comparten el cupo y el que llega tarde usa menos páginas
+        max_contexts = int(self.scraper_config.get("max_browser_contexts", 0))
+        while len(workers) < n_pages - 1:
+            if max_contexts and self._open_contexts >= max_contexts:
+                logger.info(
+                    f"Tope de {max_contexts} contextos alcanzado: {module_name} usa "
+                    f"{len(workers) + 1} páginas"
+                )
+                break
+            workers.append(await self._new_page())
+        extra_pages = [page for _, page in workers[:n_pages - 1]]
+        ready = await asyncio.gather(*(self._prepare_worker_page(p, module_name) for p in extra_pages))
+        
+        pool: asyncio.Queue = asyncio.Queue()
+        pool.put_nowait(lead_page)
+        for page, ok in zip(extra_pages, ready):
+            if ok:
+                pool.put_nowait(page)
+        # Límite adaptativo (AIMD) entre 1 y el tamaño del pool; arranca a la mitad
+        n_ready = pool.qsize()
+        if self.scraper_config.get("adaptive_concurrency", True):
+            sem = AdaptiveSemaphore(1, n_ready, initial=max(1, n_ready // 2), name=module_name)
+        else:
+            sem = AdaptiveSemaphore(n_ready, n_ready, name=module_name)
+        delay = self.scraper_config["delay_between_requests"]
+        download_sem = self._get_download_semaphore()
+        
+        async def worker(idx: int, dataset: str) -> Optional[str]:
+            # Escalonar el arranque (100 ms) para no golpear INE.Stat a la vez
+            await asyncio.sleep(0.1 * (idx % n_pages))
+            await sem.acquire()
+            page = await pool.get()
+            # Señal AIMD: False en timeouts, excepciones y descargas fallidas; un dataset
+            # que no está en el árbol no es sobrecarga (None, no ajusta el límite)
+            success: Optional[bool] = False
+            try:
+                logger.info(f"Procesando dataset: {dataset}")
+                # El cupo global cubre solo la selección y la descarga: el delay posterior
+                # no bloquea a los pools de otros módulos
+                async with download_sem:
+                    selected = await self.select_dataset(dataset, page)
+                    if not selected:
+                        success = None if selected is None else False
+                        return None
+                    file_path = await self.download_csv(dataset, page)
+                success = file_path is not None
+                # Delay entre descargas por página: hasta que la página quede sin tráfico
+                # (tope delay con jitter) más un piso corto aleatorio, para que las
+                # páginas no golpeen el sitio en fase
+                await self._settle(page, delay * random.uniform(0.5, 1.5))
+                await asyncio.sleep(random.uniform(0.1, 0.4))
+                return file_path
+            except Exception as e:
+                logger.error(f"Error procesando dataset {dataset}: {e}")
+            finally:
+                pool.put_nowait(page)
+                await sem.release(success)
+            return None
+        
+        results = await asyncio.gather(
+            *(worker(i, ds) for i, ds in enumerate(datasets)), return_exceptions=True
+        )
+        
+        # Mismo orden que la lista de datasets; una excepción no cancela al resto
+        downloaded_files = []
+        for dataset, result in zip(datasets, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Error procesando dataset {dataset}: {result}")
+            elif result:
+                downloaded_files.append(result)
+        return downloaded_files
+    
+    def _get_download_semaphore(self) -> asyncio.Semaphore:
+        """Semáforo global de descargas (se crea dentro del event loop, una vez por corrida)"""
+        if self._download_sem is None:
+            limit = self.scraper_config.get(
+                "max_concurrent_downloads", self.scraper_config.get("concurrent_pages", 1)
+            )
+            self._download_sem = asyncio.Semaphore(max(1, int(limit)))
+        return self._download_sem
+    
     async def scrape_all_modules(self) -> Dict[str, List[str]]:
         """Hacer scraping de todos los módulos configurados"""
         logger.info("Iniciando scraping completo de módulos de Agua y Aire")
         
         all_downloads = {}
+        module_keys = MODULE_KEYS
+        module_pause = self.scraper_config["delay_between_requests"] * 2
         
         try:
-            await self.navigate_to_site()
-            
-            for module_key in MODULES_TO_SCRAPE.keys():
-                logger.info(f"Procesando módulo: {module_key}")
+            if self.scraper_config.get("concurrent_modules", False) and len(module_keys) > 1:
+                # Módulos independientes (distinto <li> padre): cada uno en su propio
+                # contexto, todos sobre el mismo navegador; los contextos se crean a la
+                # vez y cada módulo carga el sitio en su página (run_module)
+                extra = await asyncio.gather(*(self._new_page() for _ in module_keys[1:]))
+                module_pages = [self.page] + [page for _, page in extra]
                 
-                downloads = await self.scrape_module(module_key)
-                all_downloads[module_key] = downloads
+                async def run_module(module_key: str, page: Page) -> List[str]:
+                    logger.info(f"Procesando módulo: {module_key}")
+                    try:
+                        await self.navigate_to_site(page)
+                    except Exception as e:
+                        logger.error(f"No se pudo cargar el sitio para el módulo {module_key}: {e}")
+                        return []
+                    files = await self.scrape_module(module_key, page)
+                    await self._persist_caches()
+                    return files
                 
-                # Delay entre módulos
-                await asyncio.sleep(self.scraper_config["delay_between_requests"] * 2)
+                results = await asyncio.gather(
+                    *(run_module(key, page) for key, page in zip(module_keys, module_pages))
+                )
+                all_downloads = dict(zip(module_keys, results))
+            else:
+                await self.navigate_to_site()
+                for module_key in module_keys:
+                    logger.info(f"Procesando módulo: {module_key}")
+                    
+                    downloads = await self.scrape_module(module_key)
+                    all_downloads[module_key] = downloads
+                    
+                    # Entre módulos: esperar solo los guardados pendientes (con tope)
+                    await self.flush_saves(timeout=module_pause)
+                    await self._persist_caches()
+            
+            # Los archivos cuyo guardado falló no se reportan como descargados
+            await self.flush_saves()
+            if self._failed_saves:
+                all_downloads = {
+                    module: [path for path in files if path not in self._failed_saves]
+                    for module, files in all_downloads.items()
+                }
             
             logger.info("Scraping completo terminado")
             
         except Exception as e:
-            logger.error(f"Error en scraping completo: {e}")
+            # Traza completa solo aquí, en el error de nivel superior
+            logger.opt(exception=True).error(f"Error en scraping completo: {e}")
             raise
         
         return all_downloads
 
-    def generate_summary_report(self, downloads: Dict[str, List[str]]):
+    async def generate_summary_report(self, downloads: Dict[str, List[str]]):
         """Generar reporte resumen de la ejecución"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        report_lines = [
-            "="*60,
-            f"REPORTE DE SCRAPING INE.STAT - {timestamp}",
-            "="*60,
-            f"Directorio de descargas: {self.downloads_dir}",
-            ""
-        ]
+        buf = io.StringIO()
+        buf.write(REPORT_HEADER_TEMPLATE.format(
+            rule=REPORT_RULE, timestamp=timestamp, downloads_dir=self.downloads_dir
+        ))
         
         total_files = 0
         for module, files in downloads.items():
-            module_info = MODULES_TO_SCRAPE[module]
-            configured_datasets = module_info["datasets"]
+            module_info = MODULES[module]
             
             # Indicar si se usó auto-descubrimiento
-            discovery_mode = "AUTO-DESCUBRIMIENTO" if not configured_datasets else "CONFIGURACIÓN PREDEFINIDA"
-            
-            report_lines.extend([
-                f"Módulo: {module_info['name']}",
-                f"Modo: {discovery_mode}",
-                f"Archivos descargados: {len(files)}",
-                ""
-            ])
-            
-            for file_path in files:
-                filename = Path(file_path).name
-                report_lines.append(f"  - {filename}")
-            
-            report_lines.append("")
+            discovery_mode = "AUTO-DESCUBRIMIENTO" if not module_info.datasets else "CONFIGURACIÓN PREDEFINIDA"
+            
+            buf.write(REPORT_MODULE_TEMPLATE.format(
+                name=module_info.name, mode=discovery_mode, count=len(files)
+            ))
+            # basename: solo el nombre, sin crear un Path por archivo
+            buf.writelines(f"  - {os.path.basename(file_path)}\n" for file_path in files)
+            buf.write("\n")
             total_files += len(files)
         
-        report_lines.extend([
-            f"TOTAL DE ARCHIVOS DESCARGADOS: {total_files}",
-            "="*60
-        ])
+        buf.write(f"TOTAL DE ARCHIVOS DESCARGADOS: {total_files}\n{REPORT_RULE}")
         
-        # Guardar reporte
+        # Guardar reporte (el texto se arma una vez y sirve para archivo y consola)
+        report_text = buf.getvalue()
+        self._ensure_downloads_dir()
         report_path = self.downloads_dir / "scraping_report.txt"
-        with open(report_path, "w", encoding="utf-8") as f:
-            f.write("\n".join(report_lines))
+        await asyncio.to_thread(_write_text, report_path, report_text)
         
-        # Mostrar en consola
-        for line in report_lines:
-            logger.info(line)
+        # Mostrar en consola: un solo mensaje multilínea, no un logger.info por línea
+        logger.info(f"Reporte de scraping:\n{report_text}")
         
-        return report_path
\ No newline at end of file
+        return report_path
@@ -3,14 +3,22 @@
 Utilidades y listados maestros de datasets esperados para verificación.
 """
 
-from typing import List, Dict
+from functools import lru_cache
+from itertools import chain
+from typing import List, Dict, FrozenSet, Tuple
+import re
+import sys
 import unicodedata
 
 __all__ = [
     "EXPECTED_DATASETS_AIRE",
     "EXPECTED_DATASETS_AGUA",
     "EXPECTED_BY_SCOPE",
+    "EXPECTED_AIRE_SET",
+    "EXPECTED_AGUA_SET",
+    "EXPECTED_ALL_SET",
     "get_expected_datasets",
+    "get_expected_norm_set",
     "safe_name",
     "_norm",
 ]
@@ -115,38 +123,62 @@ EXPECTED_BY_SCOPE: Dict[str, List[str]] = {
     "agua": EXPECTED_DATASETS_AGUA,
 }
 
+# Conjuntos inmutables (sin duplicados) para reutilizar entre comandos del CLI
+EXPECTED_AIRE_SET: FrozenSet[str] = frozenset(EXPECTED_DATASETS_AIRE)
+EXPECTED_AGUA_SET: FrozenSet[str] = frozenset(EXPECTED_DATASETS_AGUA)
+EXPECTED_ALL_SET: FrozenSet[str] = EXPECTED_AIRE_SET | EXPECTED_AGUA_SET
+
+# Tuplas que retorna get_expected_datasets (armadas una vez; "all" = unión en orden)
+_EXPECTED_TUPLES: Dict[str, Tuple[str, ...]] = {
+    scope: tuple(lst) for scope, lst in EXPECTED_BY_SCOPE.items()
+}
+_ALL_EXPECTED: Tuple[str, ...] = tuple(chain.from_iterable(EXPECTED_BY_SCOPE.values()))
+
 # --------------------------
 # Utilidades complementarias
 # --------------------------
-def get_expected_datasets(scope: str) -> List[str]:
+@lru_cache(maxsize=None)
+def get_expected_datasets(scope: str) -> Tuple[str, ...]:
     """
-    Retorna la lista esperada para un scope ('aire', 'agua').
-    Si no coincide, retorna la unión de todas.
+    Retorna la lista esperada (como tupla inmutable, precalculada) para un
+    scope ('aire', 'agua'). Si no coincide, retorna la unión de todas.
     """
     scope = (scope or "").strip().lower()
-    if scope in EXPECTED_BY_SCOPE:
-        return EXPECTED_BY_SCOPE[scope]
-    # Unión de todas las listas si el scope no existe
-    out: List[str] = []
-    for lst in EXPECTED_BY_SCOPE.values():
-        out.extend(lst)
-    return out
+    return _EXPECTED_TUPLES.get(scope, _ALL_EXPECTED)
 
+@lru_cache(maxsize=8192)
 def _norm(s: str) -> str:
-    # Normaliza Unicode (NFC) y pasa a minúsculas
+    # Normaliza Unicode (NFC) y pasa a minúsculas (memoizada: los mismos nombres se
+    # comparan una y otra vez)
     return unicodedata.normalize("NFC", s or "").lower()
 
+# Espacios -> '_', paréntesis y comas fuera (una pasada); luego se quita todo lo que
+# no sea letra/dígito (con tildes), '_', '-' o '.' ('/', ':', ... no son válidos en rutas)
+_SAFE_TABLE = str.maketrans({" ": "_", "(": None, ")": None, ",": None})
+_SAFE_RE = re.compile(r"[^\w\-.]")
+
+@lru_cache(maxsize=4096)
 def safe_name(dataset_name: str) -> str:
     """
     Sanitiza el nombre como prefijo de archivo (coherente con save_download):
     - Reemplaza espacios por '_'
-    - Elimina paréntesis y comas
-    - Mantiene tildes y otros caracteres
+    - Elimina paréntesis, comas y caracteres no válidos en nombres de archivo
+    - Mantiene tildes y otros caracteres alfanuméricos
+    """
+    return _SAFE_RE.sub("", dataset_name.translate(_SAFE_TABLE))
+
+
+# Formas normalizadas (_norm) de los esperados, calculadas una vez al importar
+# (internadas: las comparaciones entre claves repetidas son por identidad)
+EXPECTED_NORM_BY_SCOPE: Dict[str, FrozenSet[str]] = {
+    scope: frozenset(sys.intern(_norm(ds)) for ds in datasets)
+    for scope, datasets in EXPECTED_BY_SCOPE.items()
+}
+EXPECTED_NORM_ALL: FrozenSet[str] = frozenset().union(*EXPECTED_NORM_BY_SCOPE.values())
+
+def get_expected_norm_set(scope: str) -> FrozenSet[str]:
+    """
+    Conjunto normalizado (NFC + minúsculas) de los esperados de un scope
+    ('aire', 'agua'); la unión de todos si el scope no existe.
     """
-    return (
-        dataset_name
-        .replace(" ", "_")
-        .replace("(", "")
-        .replace(")", "")
-        .replace(",", "")
-    )
+    return EXPECTED_NORM_BY_SCOPE.get((scope or "").strip().lower(), EXPECTED_NORM_ALL)
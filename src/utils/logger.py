@@ -3,16 +3,24 @@ Configuración del logger para el scraper INE.Stat
 """
 
 import sys
-from pathlib import Path
 from loguru import logger
-from datetime import datetime
 
-# Configuración base
-LOGS_DIR = Path(__file__).parent.parent.parent / "logs"
-LOGS_DIR.mkdir(exist_ok=True)
+from config.settings import LOGS_DIR, ensure_dirs
+
+# Modo con el que ya se configuraron los sinks (None = sin configurar)
+_configured_mode = None
 
 def get_logger(debug_mode: bool = False):
-    """Configurar y retornar logger configurado"""
+    """
+    Configurar y retornar logger configurado. Repetir la llamada con el mismo modo
+    no rehace los sinks ni el hilo de escritura del archivo (enqueue): el scraper lo
+    pide al importarse y main.py otra vez.
+    """
+    global _configured_mode
+    if _configured_mode == debug_mode:
+        return logger
+    
+    ensure_dirs()
     
     # Remover configuración por defecto
     logger.remove()
@@ -25,18 +33,26 @@ def get_logger(debug_mode: bool = False):
         sys.stdout,
         format="<green>{time:HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{message}</cyan>",
         level=console_level,
-        colorize=True
+        colorize=True,
+        backtrace=False,
+        diagnose=False
     )
     
-    # Configurar salida a archivo
-    log_file = LOGS_DIR / f"scraper_{datetime.now().strftime('%Y-%m-%d')}.log"
+    # Configurar salida a archivo ({time} en el nombre: la retención ve todos los días)
+    log_file = LOGS_DIR / "scraper_{time:YYYY-MM-DD}.log"
     logger.add(
         log_file,
         format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {message}",
         level="DEBUG",
-        rotation="1 MB",
-        retention="1 week",
-        encoding="utf-8"
+        rotation="50 MB",
+        retention=5,  # últimos 5 archivos
+        compression="gz",
+        encoding="utf-8",
+        backtrace=False,
+        diagnose=False,
+        enqueue=True,  # escribe el hilo de loguru, no el event loop
+        buffering=1
     )
     
+    _configured_mode = debug_mode
     return logger
\ No newline at end of file